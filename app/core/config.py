@@ -1,64 +1,206 @@
 import os
-
-# Настройки PostgreSQL
-POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
-POSTGRES_DB = os.getenv("POSTGRES_DB", "mydatabase")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST", "db")
-POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
-
-DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-
-# Настройки Telegram
-TELEGRAM_BOT_TOKEN_STAFF = os.getenv("TELEGRAM_BOT_TOKEN_STAFF")
-TELEGRAM_BOT_TOKEN_STUDENT = os.getenv("TELEGRAM_BOT_TOKEN_STUDENT")
-SUPERADMIN_TOKEN = os.getenv("SUPERADMIN_TOKEN")
-
-# Настройки среды
-ENVIRONMENT = os.getenv("ENVIRONMENT", "production").lower()
-DEBUG = ENVIRONMENT in ["development", "dev"]
-
-# Настройки retry для базы данных
-DB_RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "3"))
-DB_RETRY_DELAY = float(os.getenv("DB_RETRY_DELAY", "1.0"))
-DB_RETRY_BACKOFF_FACTOR = float(os.getenv("DB_RETRY_BACKOFF_FACTOR", "2.0"))
-
-# Настройки логирования
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO" if not DEBUG else "DEBUG")
-LOG_FORMAT = os.getenv("LOG_FORMAT", "json" if not DEBUG else "text")
-
-# Настройки приложения
-APP_NAME = os.getenv("APP_NAME", "Training API")
-APP_VERSION = os.getenv("APP_VERSION", "1.0.0")
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy.engine import URL
+
+logger = logging.getLogger(__name__)
+
+# Снимок окружения: одно обращение к словарю вместо os.getenv на каждый ключ
+_ENV = os.environ.copy()
+
+
+def _get(key: str, default=None, cast=str):
+    """Прочитать переменную окружения с приведением типа"""
+    value = _ENV.get(key)
+    return cast(value) if value is not None else default
+
+
+def _to_bool(value: str) -> bool:
+    """Привести строковый флаг окружения к bool"""
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Неизменяемые настройки приложения, читаются из окружения один раз"""
+
+    # Настройки PostgreSQL
+    postgres_user: str
+    postgres_password: str
+    postgres_db: str
+    postgres_host: str
+    postgres_port: str
+    database_url: URL
+
+    # Настройки Telegram
+    telegram_bot_token_staff: Optional[str]
+    telegram_bot_token_student: Optional[str]
+    superadmin_token: Optional[str]
+
+    # Настройки среды
+    environment: str
+    debug: bool
+
+    # Настройки retry для базы данных
+    db_retry_attempts: int
+    db_retry_delay: float
+    db_retry_backoff_factor: float
+
+    # Настройки пула соединений
+    db_pool_size: int
+    db_pool_max_overflow: int
+    db_pool_timeout: int
+    db_pool_recycle: int
+    db_tcp_keepalives_idle: int
+    db_tcp_keepalives_interval: int
+    db_tcp_keepalives_count: int
+
+    # Создание схемы, миграции и начальные данные при старте
+    init_schema: bool
+
+    # Хранилище счетчиков rate limit (memory:// или redis://...)
+    rate_limit_storage_uri: str
+
+    # Настройки логирования
+    log_level: str
+    log_format: str
+    log_sample_rate: float
+
+    # Настройки приложения
+    app_name: str
+    app_version: str
+
+
+def _load_settings() -> Settings:
+    """Собрать Settings из переменных окружения"""
+    postgres_user = _get("POSTGRES_USER", "postgres")
+    postgres_password = _get("POSTGRES_PASSWORD", "postgres")
+    postgres_db = _get("POSTGRES_DB", "mydatabase")
+    postgres_host = _get("POSTGRES_HOST", "db")
+    postgres_port = _get("POSTGRES_PORT", "5432")
+
+    environment = _get("ENVIRONMENT", "production").lower()
+    debug = environment in ["development", "dev"]
+
+    return Settings(
+        postgres_user=postgres_user,
+        postgres_password=postgres_password,
+        postgres_db=postgres_db,
+        postgres_host=postgres_host,
+        postgres_port=postgres_port,
+        # URL.create экранирует спецсимволы в учетных данных
+        database_url=URL.create(
+            "postgresql+asyncpg",
+            username=postgres_user,
+            password=postgres_password,
+            host=postgres_host,
+            port=int(postgres_port),
+            database=postgres_db,
+        ),
+        telegram_bot_token_staff=_get("TELEGRAM_BOT_TOKEN_STAFF"),
+        telegram_bot_token_student=_get("TELEGRAM_BOT_TOKEN_STUDENT"),
+        superadmin_token=_get("SUPERADMIN_TOKEN"),
+        environment=environment,
+        debug=debug,
+        db_retry_attempts=_get("DB_RETRY_ATTEMPTS", 3, cast=int),
+        db_retry_delay=_get("DB_RETRY_DELAY", 1.0, cast=float),
+        db_retry_backoff_factor=_get("DB_RETRY_BACKOFF_FACTOR", 2.0, cast=float),
+        db_pool_size=_get("DB_POOL_SIZE", 20, cast=int),
+        db_pool_max_overflow=_get("DB_POOL_MAX_OVERFLOW", 10, cast=int),
+        db_pool_timeout=_get("DB_POOL_TIMEOUT", 30, cast=int),
+        db_pool_recycle=_get("DB_POOL_RECYCLE", 1800, cast=int),
+        db_tcp_keepalives_idle=_get("DB_TCP_KEEPALIVES_IDLE", 30, cast=int),
+        db_tcp_keepalives_interval=_get("DB_TCP_KEEPALIVES_INTERVAL", 10, cast=int),
+        db_tcp_keepalives_count=_get("DB_TCP_KEEPALIVES_COUNT", 5, cast=int),
+        init_schema=_get("INIT_SCHEMA", True, cast=_to_bool),
+        rate_limit_storage_uri=_get("RATE_LIMIT_STORAGE_URI", "memory://"),
+        log_level=_get("LOG_LEVEL", "INFO" if not debug else "DEBUG"),
+        log_format=_get("LOG_FORMAT", "json" if not debug else "text"),
+        log_sample_rate=_get("LOG_SAMPLE_RATE", 0.1, cast=float),
+        app_name=_get("APP_NAME", "Training API"),
+        app_version=_get("APP_VERSION", "1.0.0"),
+    )
 
 
 # Валидация критичных настроек
-def validate_config():
+def validate_config(config: Optional[Settings] = None):
     """Валидация конфигурации при запуске"""
+    config = config or get_settings()
     errors = []
 
-    if not TELEGRAM_BOT_TOKEN_STAFF:
+    if not config.telegram_bot_token_staff:
         errors.append("TELEGRAM_BOT_TOKEN_STAFF is required")
 
-    if not TELEGRAM_BOT_TOKEN_STUDENT:
+    if not config.telegram_bot_token_student:
         errors.append("TELEGRAM_BOT_TOKEN_STUDENT is required")
 
-    if not POSTGRES_HOST:
+    if not config.postgres_host:
         errors.append("POSTGRES_HOST is required")
 
-    if DB_RETRY_ATTEMPTS < 1:
+    if config.db_retry_attempts < 1:
         errors.append("DB_RETRY_ATTEMPTS must be >= 1")
 
-    if DB_RETRY_DELAY < 0:
+    if config.db_retry_delay < 0:
         errors.append("DB_RETRY_DELAY must be >= 0")
 
+    if config.db_pool_size < 1:
+        errors.append("DB_POOL_SIZE must be >= 1")
+
+    if not 0 <= config.log_sample_rate <= 1:
+        errors.append("LOG_SAMPLE_RATE must be between 0 and 1")
+
     if errors:
         raise ValueError(f"Configuration errors: {'; '.join(errors)}")
 
 
-# Автоматическая валидация при импорте (опционально)
-if os.getenv("VALIDATE_CONFIG_ON_IMPORT", "true").lower() == "true":
-    try:
-        validate_config()
-    except ValueError as e:
-        print(f"⚠️  Configuration warning: {e}")
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Получить настройки приложения.
+    Окружение читается и валидируется один раз на процесс.
+    """
+    config = _load_settings()
+
+    # Валидация при первом обращении (опционально)
+    if _get("VALIDATE_CONFIG_ON_IMPORT", "true").lower() == "true":
+        try:
+            validate_config(config)
+        except ValueError as e:
+            logger.warning("⚠️  Configuration warning: %s", e)
+
+    return config
+
+
+settings = get_settings()
+
+# Модульные константы для обратной совместимости
+POSTGRES_USER = settings.postgres_user
+POSTGRES_PASSWORD = settings.postgres_password
+POSTGRES_DB = settings.postgres_db
+POSTGRES_HOST = settings.postgres_host
+POSTGRES_PORT = settings.postgres_port
+
+DATABASE_URL = settings.database_url
+
+TELEGRAM_BOT_TOKEN_STAFF = settings.telegram_bot_token_staff
+TELEGRAM_BOT_TOKEN_STUDENT = settings.telegram_bot_token_student
+SUPERADMIN_TOKEN = settings.superadmin_token
+
+ENVIRONMENT = settings.environment
+DEBUG = settings.debug
+
+DB_RETRY_ATTEMPTS = settings.db_retry_attempts
+DB_RETRY_DELAY = settings.db_retry_delay
+DB_RETRY_BACKOFF_FACTOR = settings.db_retry_backoff_factor
+
+INIT_SCHEMA = settings.init_schema
+
+LOG_LEVEL = settings.log_level
+LOG_FORMAT = settings.log_format
+LOG_SAMPLE_RATE = settings.log_sample_rate
+
+APP_NAME = settings.app_name
+APP_VERSION = settings.app_version
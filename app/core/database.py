@@ -1,9 +1,14 @@
 import asyncio
 import logging
 from functools import wraps
-from typing import Callable, TypeVar, Any, AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from typing import Callable, TypeVar, Any, AsyncGenerator, Optional
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import declarative_base
 from sqlalchemy.sql import text
 from sqlalchemy.exc import (
     SQLAlchemyError,
@@ -11,43 +16,153 @@ from sqlalchemy.exc import (
     DisconnectionError,
     TimeoutError,
 )
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    RetryError,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 from asyncpg.exceptions import (
     ConnectionFailureError,
     ConnectionDoesNotExistError,
 )
 
-from .config import DATABASE_URL, DB_RETRY_ATTEMPTS, DB_RETRY_DELAY
+from .config import settings
 from .exceptions import DatabaseConnectionError, DatabaseTimeoutError
 
 logger = logging.getLogger(__name__)
 
 engine = create_async_engine(
-    DATABASE_URL,
+    settings.database_url,
     echo=False,
-    pool_size=20,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=3600,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_pool_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
     pool_pre_ping=True,
+    connect_args={
+        # TCP keepalive, чтобы NAT/балансировщики не обрывали простаивающие соединения
+        "server_settings": {
+            "tcp_keepalives_idle": str(settings.db_tcp_keepalives_idle),
+            "tcp_keepalives_interval": str(settings.db_tcp_keepalives_interval),
+            "tcp_keepalives_count": str(settings.db_tcp_keepalives_count),
+            # JIT не окупается на коротких OLTP-запросах и замедляет интроспекцию
+            # типов asyncpg при установке соединения
+            "jit": "off",
+        }
+    },
 )
 
-async_session = sessionmaker(
+async_session = async_sessionmaker(
     engine,
-    class_=AsyncSession,
     expire_on_commit=False,
     autoflush=False,
 )
 
 Base = declarative_base()
 
+# Запрос проверки соединения, создается один раз
+_HEALTH_STMT = text("SELECT 1")
+
+# Таблицы текущей схемы: одним запросом вместо проверки каждой таблицы
+_EXISTING_TABLES_STMT = text(
+    "SELECT tablename FROM pg_catalog.pg_tables WHERE schemaname = current_schema()"
+)
+
+# Прогрев соединения: заодно загружает кодеки asyncpg для частых типов
+_WARMUP_STMT = text("SELECT 1::int, ''::text, now()")
+
 F = TypeVar("F", bound=Callable[..., Any])
 
+# Исключения, при которых операцию имеет смысл повторить
+_DEFAULT_RETRY_EXC = (
+    OperationalError,
+    DisconnectionError,
+    TimeoutError,
+    ConnectionFailureError,
+    ConnectionDoesNotExistError,
+)
+
+# Исключения, которые преобразуются в DatabaseConnectionError
+_CONNECTION_EXC = (
+    ConnectionFailureError,
+    ConnectionDoesNotExistError,
+    DisconnectionError,
+)
+
+
+def _log_retry_attempt(retry_state: RetryCallState):
+    """Залогировать неудачную попытку перед ожиданием следующей"""
+    e = retry_state.outcome.exception()
+    max_attempts = retry_state.retry_object.stop.max_attempt_number
+    name = retry_state.fn.__name__ if retry_state.fn else "unknown"
+    logger.warning(
+        "Database operation failed (attempt %d/%d): %s",
+        retry_state.attempt_number,
+        max_attempts,
+        e,
+        extra={
+            "function": name,
+            "attempt": retry_state.attempt_number,
+            "max_attempts": max_attempts,
+            "exception_type": type(e).__name__,
+        },
+    )
+
+
+def _build_retrying(
+    max_attempts: int,
+    delay: float,
+    backoff_factor: float = 2.0,
+    exceptions: tuple = _DEFAULT_RETRY_EXC,
+    max_delay: float = 30.0,
+    jitter: float = 1.0,
+) -> AsyncRetrying:
+    """Собрать политику повторов tenacity"""
+    return AsyncRetrying(
+        stop=stop_after_attempt(max_attempts),
+        wait=wait_exponential_jitter(
+            initial=delay, max=max_delay, exp_base=backoff_factor, jitter=jitter
+        ),
+        retry=retry_if_exception_type(exceptions),
+        before_sleep=_log_retry_attempt,
+        reraise=False,
+    )
+
+
+def _log_non_retryable(func: Callable, e: Exception):
+    """Залогировать ошибку, для которой retry не выполняется"""
+    logger.error(
+        "Non-retryable database error in %s: %s",
+        func.__name__,
+        e,
+        extra={
+            "function": func.__name__,
+            "exception_type": type(e).__name__,
+        },
+    )
+
+
+def _map_retry_error(name: str, max_attempts: int, exc: BaseException) -> Exception:
+    """Преобразовать исключение после исчерпания попыток в исключение приложения"""
+    if isinstance(exc, _CONNECTION_EXC):
+        return DatabaseConnectionError(
+            f"Database connection failed after {max_attempts} attempts"
+        )
+    if isinstance(exc, TimeoutError):
+        return DatabaseTimeoutError(name, 30)
+    return exc
+
 
 def db_retry(
     max_attempts: int = None,
     delay: float = None,
     backoff_factor: float = 2.0,
-    exceptions: tuple = None,
+    exceptions: tuple = _DEFAULT_RETRY_EXC,
+    max_delay: float = 30.0,
+    jitter: float = 1.0,
 ) -> Callable[[F], F]:
     """
     Decorator для повторных попыток операций с базой данных
@@ -57,91 +172,49 @@ def db_retry(
         delay: Начальная задержка между попытками (по умолчанию из config)
         backoff_factor: Множитель для увеличения задержки
         exceptions: Кортеж исключений для повтора
+        max_delay: Максимальная задержка между попытками
+        jitter: Максимальный случайный разброс задержки в секундах
     """
     if max_attempts is None:
-        max_attempts = DB_RETRY_ATTEMPTS
+        max_attempts = settings.db_retry_attempts
 
     if delay is None:
-        delay = DB_RETRY_DELAY
-
-    if exceptions is None:
-        exceptions = (
-            OperationalError,
-            DisconnectionError,
-            TimeoutError,
-            ConnectionFailureError,
-            ConnectionDoesNotExistError,
-        )
+        delay = settings.db_retry_delay
+
+    # Политика собирается один раз при декорировании
+    retrying = _build_retrying(
+        max_attempts, delay, backoff_factor, exceptions, max_delay, jitter
+    )
 
     def decorator(func: F) -> F:
+        # tenacity копирует состояние retry на каждый вызов
+        retrying_func = retrying.wraps(func)
+
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            current_delay = delay
-            last_exception = None
-
-            for attempt in range(max_attempts):
-                try:
-                    return await func(*args, **kwargs)
-
-                except exceptions as e:
-                    last_exception = e
-
-                    if attempt == max_attempts - 1:
-                        # Последняя попытка - выбрасываем исключение
-                        break
-
-                    # Логируем попытку
-                    logger.warning(
-                        f"Database operation failed (attempt {attempt + 1}/{max_attempts}): {str(e)}",
-                        extra={
-                            "function": func.__name__,
-                            "attempt": attempt + 1,
-                            "max_attempts": max_attempts,
-                            "exception_type": type(e).__name__,
-                        },
-                    )
-
-                    # Ждем перед следующей попыткой
-                    await asyncio.sleep(current_delay)
-                    current_delay *= backoff_factor
-
-                except Exception as e:
-                    # Для других исключений не делаем retry
-                    logger.error(
-                        f"Non-retryable database error in {func.__name__}: {str(e)}",
-                        extra={
-                            "function": func.__name__,
-                            "exception_type": type(e).__name__,
-                        },
-                    )
-                    raise
-
-            # Если мы здесь, значит все попытки исчерпаны
-            logger.error(
-                f"Database operation failed after {max_attempts} attempts: {str(last_exception)}",
-                extra={
-                    "function": func.__name__,
-                    "max_attempts": max_attempts,
-                    "final_exception": str(last_exception),
-                },
-            )
-
-            # Преобразуем в наше исключение
-            if isinstance(
-                last_exception,
-                (
-                    ConnectionFailureError,
-                    ConnectionDoesNotExistError,
-                    DisconnectionError,
-                ),
-            ):
-                raise DatabaseConnectionError(
-                    f"Database connection failed after {max_attempts} attempts"
+            try:
+                return await retrying_func(*args, **kwargs)
+            except RetryError as retry_error:
+                # Все попытки исчерпаны
+                last_exception = retry_error.last_attempt.exception()
+                logger.error(
+                    "Database operation failed after %d attempts: %s",
+                    max_attempts,
+                    last_exception,
+                    extra={
+                        "function": func.__name__,
+                        "max_attempts": max_attempts,
+                        "final_exception": str(last_exception),
+                    },
                 )
-            elif isinstance(last_exception, TimeoutError):
-                raise DatabaseTimeoutError(func.__name__, 30)
-            else:
-                raise last_exception
+                mapped = _map_retry_error(func.__name__, max_attempts, last_exception)
+                if mapped is last_exception:
+                    raise last_exception
+                raise mapped from last_exception
+            except Exception as e:
+                # Для других исключений retry не выполняется
+                _log_non_retryable(func, e)
+                raise
 
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
@@ -157,55 +230,64 @@ def db_retry(
     return decorator
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+class LazySession:
     """
-    Dependency для получения сессии базы данных с retry механизмом
+    Прокси для AsyncSession: сессия создается только при первом обращении.
+    Endpoints, которые не обращаются к БД, не создают сессию вообще.
+
+    Это не AsyncSession: isinstance(session, AsyncSession) ложно, а
+    dunder-методы и `async with session` не проксируются (__getattr__
+    вызывается только для обычных атрибутов).
     """
-    session = None
-    max_attempts = DB_RETRY_ATTEMPTS
-    current_delay = DB_RETRY_DELAY
 
-    # Retry только для создания сессии
-    for attempt in range(max_attempts):
-        try:
-            session = async_session()
-            break
-        except (
-            OperationalError,
-            DisconnectionError,
-            ConnectionFailureError,
-            ConnectionDoesNotExistError,
-        ) as e:
-            if attempt == max_attempts - 1:
-                logger.error(
-                    f"Failed to create session after {max_attempts} attempts: {str(e)}"
-                )
-                raise DatabaseConnectionError(
-                    f"Database connection failed after {max_attempts} attempts"
-                )
+    __slots__ = ("_session",)
 
-            logger.warning(
-                f"Session creation failed (attempt {attempt + 1}/{max_attempts}): {str(e)}"
-            )
-            await asyncio.sleep(current_delay)
-            current_delay *= 2.0
+    def __init__(self):
+        self._session: Optional[AsyncSession] = None
+
+    def _materialize(self) -> AsyncSession:
+        if self._session is None:
+            self._session = async_session()
+        return self._session
 
-    if session is None:
-        raise DatabaseConnectionError("Failed to create database session")
+    def __getattr__(self, name: str):
+        return getattr(self._materialize(), name)
+
+    async def aclose(self, rollback: bool = False):
+        """Откатить (при необходимости) и закрыть сессию, если она была создана"""
+        if self._session is None:
+            return
+        try:
+            if rollback:
+                await self._session.rollback()
+        finally:
+            await self._session.close()
+            self._session = None
 
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency для получения сессии базы данных
+    """
+    # Сессия создается лениво при первом запросе к БД. Retry выполняется
+    # в CRUD слое (db_retry), где реально выполняются запросы.
+    session = LazySession()
     try:
         yield session
     except Exception as e:
-        await session.rollback()
-        logger.error(f"Session error: {str(e)}")
+        logger.error("Session error: %s", e)
+        await session.aclose(rollback=True)
         raise
     finally:
-        await session.close()
+        await session.aclose()
 
 
 class DatabaseManager:
     """Менеджер для управления операциями с базой данных"""
 
+    # DDL выполняется один раз на процесс
+    _tables_created = False
+
     @staticmethod
     @db_retry()
     async def execute_with_retry(
@@ -225,34 +307,95 @@ class DatabaseManager:
             return result
         except Exception as e:
             await session.rollback()
-            logger.error(f"Database operation failed: {str(e)}")
+            logger.error("Database operation failed: %s", e)
             raise
 
     @staticmethod
-    @db_retry()
-    async def create_tables():
-        """Создание всех таблиц в базе данных"""
+    async def create_tables(conn: AsyncConnection):
+        """
+        Создание всех таблиц в базе данных
+
+        Без retry: соединение принадлежит внешней транзакции, после ошибки
+        она уже прервана и повтор на ней невозможен.
+
+        Args:
+            conn: Соединение с открытой транзакцией
+        """
+        if DatabaseManager._tables_created:
+            logger.debug("Database tables already created in this process")
+            return
+
         try:
-            async with engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
+            await DatabaseManager._create_missing_tables(conn)
             logger.info("Database tables created successfully")
         except Exception as e:
-            logger.error(f"Failed to create database tables: {str(e)}")
+            logger.error("Failed to create database tables: %s", e)
             raise
 
+    @staticmethod
+    def mark_tables_created():
+        """Отметить таблицы созданными (вызывать после COMMIT транзакции)"""
+        DatabaseManager._tables_created = True
+
+    @staticmethod
+    async def _create_missing_tables(conn: AsyncConnection):
+        """Создать только отсутствующие таблицы"""
+        result = await conn.execute(_EXISTING_TABLES_STMT)
+        existing = set(result.scalars())
+        missing = [
+            table for table in Base.metadata.sorted_tables if table.name not in existing
+        ]
+        if missing:
+            # checkfirst остается включенным для ENUM типов новых таблиц
+            await conn.run_sync(Base.metadata.create_all, tables=missing)
+
+    @staticmethod
+    async def drop_tables():
+        """Удаление всех таблиц в базе данных"""
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        DatabaseManager._tables_created = False
+        logger.info("Database tables dropped")
+
     @staticmethod
     @db_retry()
     async def check_connection():
         """Проверка соединения с базой данных"""
         try:
-            async with engine.begin() as conn:
-                await conn.execute(text("SELECT 1"))
-            logger.info("Database connection check successful")
+            # AUTOCOMMIT: проверка без пары BEGIN/COMMIT
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(_HEALTH_STMT)
+            logger.debug("Database connection check successful")
             return True
         except Exception as e:
-            logger.error(f"Database connection check failed: {str(e)}")
+            logger.error("Database connection check failed: %s", e)
             raise DatabaseConnectionError("Database connection check failed")
 
+    @staticmethod
+    async def warm_up_pool(size: Optional[int] = None):
+        """
+        Заранее открыть соединения пула, чтобы первые запросы не ждали подключения
+
+        Args:
+            size: Количество соединений (по умолчанию размер пула)
+        """
+        size = size or settings.db_pool_size
+
+        async def touch():
+            async with engine.connect() as conn:
+                await conn.execute(_WARMUP_STMT)
+
+        # Соединения удерживаются одновременно, иначе пул вернет одно и то же
+        results = await asyncio.gather(
+            *(touch() for _ in range(size)), return_exceptions=True
+        )
+        failed = sum(isinstance(result, Exception) for result in results)
+        if failed:
+            logger.warning("Pool warm-up: %d of %d connections failed", failed, size)
+        else:
+            logger.info("Pool warm-up: %d connections ready", size)
+
     @staticmethod
     async def close_connections():
         """Закрытие всех соединений с базой данных"""
@@ -260,7 +403,7 @@ class DatabaseManager:
             await engine.dispose()
             logger.info("Database connections closed successfully")
         except Exception as e:
-            logger.error(f"Error closing database connections: {str(e)}")
+            logger.error("Error closing database connections: %s", e)
 
 
 # Экспортируем для обратной совместимости
@@ -284,7 +427,7 @@ class TransactionManager:
             return result
         except Exception as e:
             await self.session.rollback()
-            logger.error(f"Transaction failed: {str(e)}")
+            logger.error("Transaction failed: %s", e)
             raise
 
     async def __aenter__(self):
@@ -313,27 +456,36 @@ def db_operation(func: F) -> F:
     Декоратор для CRUD операций с автоматическим retry и логированием
     """
 
+    operation_name = func.__name__
+
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        operation_name = func.__name__
+        # Уровень проверяем один раз на вызов: debug-логи на каждую CRUD операцию
+        debug = logger.isEnabledFor(logging.DEBUG)
 
         try:
-            logger.debug(f"Starting database operation: {operation_name}")
+            if debug:
+                logger.debug("Starting database operation: %s", operation_name)
             result = await func(*args, **kwargs)
 
-            logger.debug(f"Database operation completed: {operation_name}")
+            if debug:
+                logger.debug("Database operation completed: %s", operation_name)
             return result
 
         except SQLAlchemyError as e:
             logger.error(
-                f"SQLAlchemy error in {operation_name}: {str(e)}",
+                "SQLAlchemy error in %s: %s",
+                operation_name,
+                e,
                 extra={"operation": operation_name, "exception_type": type(e).__name__},
             )
             raise
 
         except Exception as e:
             logger.error(
-                f"Unexpected error in {operation_name}: {str(e)}",
+                "Unexpected error in %s: %s",
+                operation_name,
+                e,
                 extra={"operation": operation_name, "exception_type": type(e).__name__},
             )
             raise
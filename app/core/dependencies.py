@@ -1,12 +1,9 @@
+from functools import lru_cache
 from typing import Dict, Any
 from fastapi import Depends, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.config import (
-    TELEGRAM_BOT_TOKEN_STAFF,
-    TELEGRAM_BOT_TOKEN_STUDENT,
-    SUPERADMIN_TOKEN,
-)
-from app.core.telegram_auth import TelegramAuth
+from app.core.config import settings
+from app.core.telegram_auth import TelegramAuth, get_telegram_auth
 from app.core.exceptions import (
     AuthenticationError,
     AuthorizationError,
@@ -19,31 +16,40 @@ security = HTTPBearer(
     description="Enter your Telegram Web App initData string",
 )
 
-if not TELEGRAM_BOT_TOKEN_STAFF:
-    raise ConfigurationError(
-        "TELEGRAM_BOT_TOKEN_STAFF", "Staff telegram bot token is required"
-    )
 
-if not TELEGRAM_BOT_TOKEN_STUDENT:
-    raise ConfigurationError(
-        "TELEGRAM_BOT_TOKEN_STUDENT", "Student telegram bot token is required"
-    )
+@lru_cache(maxsize=1)
+def _staff_auth() -> TelegramAuth:
+    """TelegramAuth для staff бота, создается при первом использовании"""
+    if not settings.telegram_bot_token_staff:
+        raise ConfigurationError(
+            "TELEGRAM_BOT_TOKEN_STAFF", "Staff telegram bot token is required"
+        )
+    return get_telegram_auth(settings.telegram_bot_token_staff)
 
 
-telegram_auth_staff = TelegramAuth(TELEGRAM_BOT_TOKEN_STAFF)
-telegram_auth_student = TelegramAuth(TELEGRAM_BOT_TOKEN_STUDENT)
+@lru_cache(maxsize=1)
+def _student_auth() -> TelegramAuth:
+    """TelegramAuth для student бота, создается при первом использовании"""
+    if not settings.telegram_bot_token_student:
+        raise ConfigurationError(
+            "TELEGRAM_BOT_TOKEN_STUDENT", "Student telegram bot token is required"
+        )
+    return get_telegram_auth(settings.telegram_bot_token_student)
 
 
-async def get_current_staff_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+def _authenticate_user(
+    telegram_auth: TelegramAuth, init_data: str, user_kind: str
 ) -> Dict[str, Any]:
-    """Dependency для аутентификации staff пользователей"""
+    """
+    Синхронная проверка initData (только HMAC и разбор, без I/O).
+    Вызывается напрямую из async dependencies: FastAPI выполняет
+    sync dependencies в threadpool, поэтому сами dependencies остаются async.
+    """
     try:
-        init_data = credentials.credentials
-        if not init_data or not init_data.strip():
+        if not init_data or init_data.isspace():
             raise AuthenticationError("Authentication data is required")
 
-        auth_data = telegram_auth_staff.authenticate(init_data)
+        auth_data = telegram_auth.authenticate(init_data)
 
         if "user" in auth_data and auth_data["user"]:
             return auth_data["user"]
@@ -52,28 +58,25 @@ async def get_current_staff_user(
     except TelegramAuthError as e:
         raise e
     except Exception as e:
-        raise TelegramAuthError(f"Staff telegram authentication failed: {str(e)}")
+        raise TelegramAuthError(
+            f"{user_kind} telegram authentication failed: {str(e)}"
+        )
 
 
-async def get_current_student_user(
+async def get_current_staff_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> Dict[str, Any]:
-    """Dependency для аутентификации student пользователей"""
-    try:
-        init_data = credentials.credentials
-        if not init_data or not init_data.strip():
-            raise AuthenticationError("Authentication data is required")
-
-        auth_data = telegram_auth_student.authenticate(init_data)
+    """Dependency для аутентификации staff пользователей"""
+    return _authenticate_user(_staff_auth(), credentials.credentials, "Staff")
 
-        if "user" in auth_data and auth_data["user"]:
-            return auth_data["user"]
-        return auth_data
 
-    except TelegramAuthError as e:
-        raise e
-    except Exception as e:
-        raise TelegramAuthError(f"Student telegram authentication failed: {str(e)}")
+async def get_current_student_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> Dict[str, Any]:
+    """Dependency для аутентификации student пользователей"""
+    return _authenticate_user(
+        _student_auth(), credentials.credentials, "Student"
+    )
 
 
 def verify_superadmin_token(x_superadmin_token: str = Header(...)):
@@ -84,7 +87,7 @@ def verify_superadmin_token(x_superadmin_token: str = Header(...)):
         ConfigurationError: Если токен суперадмина не настроен
         AuthorizationError: Если токен неверный
     """
-    if not SUPERADMIN_TOKEN:
+    if not settings.superadmin_token:
         raise ConfigurationError(
             "SUPERADMIN_TOKEN", "SuperAdmin token not configured on server"
         )
@@ -92,7 +95,7 @@ def verify_superadmin_token(x_superadmin_token: str = Header(...)):
     if not x_superadmin_token:
         raise AuthorizationError("SuperAdmin token header is required")
 
-    if x_superadmin_token != SUPERADMIN_TOKEN:
+    if x_superadmin_token != settings.superadmin_token:
         raise AuthorizationError("Invalid superadmin token")
 
     return True
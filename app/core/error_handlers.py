@@ -1,11 +1,10 @@
 import logging
 import traceback
-import json
 import re
-import os
-from typing import Union
+from typing import Mapping, Optional, Union
+import orjson
 from fastapi import Request, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from fastapi.exceptions import ValidationException
 from pydantic import ValidationError as PydanticValidationError
 from sqlalchemy.exc import (
@@ -22,6 +21,7 @@ from asyncpg.exceptions import (
     TooManyConnectionsError,
 )
 
+from app.core.config import settings
 from app.core.exceptions import (
     BaseAppException,
     DatabaseError,
@@ -33,65 +33,114 @@ from app.core.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# Окружение не меняется за время жизни процесса
+_IS_DEVELOPMENT = settings.debug
+
+_CONSTRAINT_RE = re.compile(r'constraint "([^"]+)"')
+
+# Типы, которые orjson всегда сериализует (int исключен из-за ограничения в 64 бита)
+_JSON_SAFE_SCALARS = (str, bool, float)
+
+
+def _json_default(value):
+    """Сериализация типов, которые orjson не знает (MappingProxyType деталей)"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError
+
+
+def _json_response(status_code: int, payload: dict) -> Response:
+    """JSON ответ: orjson сразу отдает bytes, без повторного кодирования"""
+    return Response(
+        content=orjson.dumps(
+            payload, default=_json_default, option=orjson.OPT_NON_STR_KEYS
+        ),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def _parse_constraint(message: str) -> Optional[str]:
+    """Извлечь имя constraint из текста ошибки PostgreSQL"""
+    if "constraint" not in message.lower():
+        return None
+    match = _CONSTRAINT_RE.search(message)
+    return match.group(1) if match else None
+
 
 async def app_exception_handler(
     request: Request, exc: BaseAppException
-) -> JSONResponse:
+) -> Response:
     """Обработчик пользовательских исключений приложения"""
 
+    path = request.url.path
+
     # Логируем ошибку
     log_level = logging.WARNING if exc.status_code < 500 else logging.ERROR
-    logger.log(
-        log_level,
-        f"App exception: {exc.error_code} - {exc.message}",
-        extra={
-            "error_code": exc.error_code,
-            "status_code": exc.status_code,
-            "details": exc.details,
-            "path": request.url.path,
-            "method": request.method,
-        },
-    )
+    # extra собираем только если запись действительно будет выведена
+    if logger.isEnabledFor(log_level):
+        logger.log(
+            log_level,
+            "App exception: %s - %s",
+            exc.error_code,
+            exc.message,
+            extra={
+                "error_code": exc.error_code,
+                "status_code": exc.status_code,
+                "details": dict(exc.details),
+                "path": path,
+                "method": request.method,
+            },
+        )
 
-    return JSONResponse(
-        status_code=exc.status_code,
-        content={
+    return _json_response(
+        exc.status_code,
+        {
             "error": exc.error_code,
             "message": exc.message,
             "details": exc.details,
-            "path": request.url.path,
+            "path": path,
         },
     )
 
 
-async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
+async def http_exception_handler(
+    request: Request, exc: HTTPException
+) -> Response:
     """Обработчик стандартных HTTP исключений"""
 
-    logger.warning(
-        f"HTTP exception: {exc.status_code} - {exc.detail}",
-        extra={
-            "status_code": exc.status_code,
-            "path": request.url.path,
-            "method": request.method,
-        },
-    )
+    path = request.url.path
+
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(
+            "HTTP exception: %s - %s",
+            exc.status_code,
+            exc.detail,
+            extra={
+                "status_code": exc.status_code,
+                "path": path,
+                "method": request.method,
+            },
+        )
 
-    return JSONResponse(
-        status_code=exc.status_code,
-        content={
+    return _json_response(
+        exc.status_code,
+        {
             "error": "HTTP_ERROR",
             "message": exc.detail,
             "details": {},
-            "path": request.url.path,
+            "path": path,
         },
     )
 
 
 async def validation_exception_handler(
     request: Request, exc: Union[ValidationException, PydanticValidationError]
-) -> JSONResponse:
+) -> Response:
     """Обработчик ошибок валидации"""
 
+    path = request.url.path
+
     if isinstance(exc, PydanticValidationError):
         errors = exc.errors()
     else:
@@ -106,11 +155,14 @@ async def validation_exception_handler(
         safe_input = None
 
         if input_value is not None:
-            try:
-                json.dumps(input_value)
+            if isinstance(input_value, _JSON_SAFE_SCALARS):
                 safe_input = input_value
-            except (TypeError, ValueError):
-                safe_input = str(input_value)
+            else:
+                try:
+                    orjson.dumps(input_value)
+                    safe_input = input_value
+                except TypeError:
+                    safe_input = str(input_value)
 
         formatted_errors.append(
             {
@@ -121,67 +173,97 @@ async def validation_exception_handler(
             }
         )
 
-    logger.warning(
-        f"Validation error: {len(formatted_errors)} field(s)",
-        extra={
-            "errors": formatted_errors,
-            "path": request.url.path,
-            "method": request.method,
-        },
-    )
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(
+            "Validation error: %d field(s)",
+            len(formatted_errors),
+            extra={
+                "errors": formatted_errors,
+                "path": path,
+                "method": request.method,
+            },
+        )
 
-    return JSONResponse(
-        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={
+    return _json_response(
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        {
             "error": "VALIDATION_ERROR",
             "message": f"Validation failed for {len(formatted_errors)} field(s)",
             "details": {"fields": formatted_errors},
-            "path": request.url.path,
+            "path": path,
         },
     )
 
 
-async def database_exception_handler(
-    request: Request, exc: SQLAlchemyError
-) -> JSONResponse:
-    """Обработчик ошибок SQLAlchemy"""
+def _integrity_error(exc: IntegrityError) -> BaseAppException:
+    orig_str = str(exc.orig)
+    constraint = "unknown"
+    if exc.orig and hasattr(exc.orig, "constraint_name"):
+        constraint = exc.orig.constraint_name
+    else:
+        constraint = _parse_constraint(orig_str) or constraint
 
-    if isinstance(exc, IntegrityError):
-        constraint = "unknown"
-        if exc.orig and hasattr(exc.orig, "constraint_name"):
-            constraint = exc.orig.constraint_name
-        elif "constraint" in str(exc.orig).lower():
-            match = re.search(r'constraint "([^"]+)"', str(exc.orig))
-            if match:
-                constraint = match.group(1)
+    return DatabaseIntegrityError(constraint, {"original_error": orig_str})
 
-        app_exc = DatabaseIntegrityError(constraint, {"original_error": str(exc.orig)})
 
-    elif isinstance(exc, (OperationalError, DisconnectionError)):
-        app_exc = DatabaseConnectionError("Database connection lost")
+def _connection_lost(exc: SQLAlchemyError) -> BaseAppException:
+    return DatabaseConnectionError("Database connection lost")
 
-    elif isinstance(exc, TimeoutError):
-        app_exc = DatabaseTimeoutError("database_operation", 30)
 
-    else:
-        app_exc = DatabaseError(f"Database operation failed: {str(exc)}")
+def _timeout(exc: SQLAlchemyError) -> BaseAppException:
+    return DatabaseTimeoutError("database_operation", 30)
+
+
+# Преобразование ошибок SQLAlchemy в исключения приложения (порядок важен
+# для проверки подклассов)
+_DB_EXCEPTION_FACTORIES = {
+    IntegrityError: _integrity_error,
+    OperationalError: _connection_lost,
+    DisconnectionError: _connection_lost,
+    TimeoutError: _timeout,
+}
 
-    logger.error(
-        f"Database exception: {type(exc).__name__} - {str(exc)}",
-        extra={
-            "exception_type": type(exc).__name__,
-            "path": request.url.path,
-            "method": request.method,
-            "traceback": traceback.format_exc(),
-        },
-    )
+
+def _to_app_exception(exc: SQLAlchemyError) -> BaseAppException:
+    """Найти фабрику по точному типу, для подклассов - через isinstance"""
+    factory = _DB_EXCEPTION_FACTORIES.get(type(exc))
+    if factory is None:
+        for exc_type, candidate in _DB_EXCEPTION_FACTORIES.items():
+            if isinstance(exc, exc_type):
+                factory = candidate
+                break
+        else:
+            return DatabaseError(f"Database operation failed: {str(exc)}")
+
+    return factory(exc)
+
+
+async def database_exception_handler(
+    request: Request, exc: SQLAlchemyError
+) -> Response:
+    """Обработчик ошибок SQLAlchemy"""
+
+    app_exc = _to_app_exception(exc)
+
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(
+            "Database exception: %s - %s",
+            type(exc).__name__,
+            exc,
+            extra={
+                "exception_type": type(exc).__name__,
+                "path": request.url.path,
+                "method": request.method,
+            },
+            exc_info=exc,
+        )
 
     return await app_exception_handler(request, app_exc)
 
 
 async def postgres_exception_handler(
     request: Request, exc: PostgresError
-) -> JSONResponse:
+) -> Response:
     """Обработчик ошибок PostgreSQL/asyncpg"""
 
     if isinstance(exc, (ConnectionFailureError, ConnectionDoesNotExistError)):
@@ -194,52 +276,57 @@ async def postgres_exception_handler(
             f"PostgreSQL error: {str(exc)}", details={"postgres_code": error_code}
         )
 
-    logger.error(
-        f"PostgreSQL exception: {type(exc).__name__} - {str(exc)}",
-        extra={
-            "exception_type": type(exc).__name__,
-            "postgres_code": getattr(exc, "sqlstate", None),
-            "path": request.url.path,
-            "method": request.method,
-        },
-    )
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(
+            "PostgreSQL exception: %s - %s",
+            type(exc).__name__,
+            exc,
+            extra={
+                "exception_type": type(exc).__name__,
+                "postgres_code": getattr(exc, "sqlstate", None),
+                "path": request.url.path,
+                "method": request.method,
+            },
+        )
 
     return await app_exception_handler(request, app_exc)
 
 
-async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def general_exception_handler(
+    request: Request, exc: Exception
+) -> Response:
     """Обработчик всех остальных исключений"""
 
-    logger.error(
-        f"Unhandled exception: {type(exc).__name__} - {str(exc)}",
-        extra={
-            "exception_type": type(exc).__name__,
-            "path": request.url.path,
-            "method": request.method,
-            "traceback": traceback.format_exc(),
-        },
-    )
-
-    is_development = os.getenv("ENVIRONMENT", "production").lower() in [
-        "development",
-        "dev",
-    ]
+    path = request.url.path
+
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(
+            "Unhandled exception: %s - %s",
+            type(exc).__name__,
+            exc,
+            extra={
+                "exception_type": type(exc).__name__,
+                "path": path,
+                "method": request.method,
+            },
+            exc_info=exc,
+        )
 
-    if is_development:
+    if _IS_DEVELOPMENT:
         details = {
             "exception_type": type(exc).__name__,
-            "traceback": traceback.format_exc(),
+            "traceback": "".join(traceback.format_exception(exc)),
         }
     else:
         details = {}
 
-    return JSONResponse(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={
+    return _json_response(
+        status.HTTP_500_INTERNAL_SERVER_ERROR,
+        {
             "error": "INTERNAL_SERVER_ERROR",
             "message": "An unexpected error occurred",
             "details": details,
-            "path": request.url.path,
+            "path": path,
         },
     )
 
@@ -1,20 +1,35 @@
-from typing import Optional, Dict, Any
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping
+
+# Общий неизменяемый пустой словарь деталей, чтобы не создавать новый на каждый raise
+_EMPTY_DETAILS: Mapping[str, Any] = MappingProxyType({})
 
 
 class BaseAppException(Exception):
     """Базовое исключение приложения"""
 
+    # HTTP статус, код ошибки и детали по умолчанию задаются на уровне класса
+    status_code: int = 500
+    error_code: Optional[str] = None
+    details: Mapping[str, Any] = _EMPTY_DETAILS
+
     def __init__(
         self,
         message: str,
-        status_code: int = 500,
+        status_code: Optional[int] = None,
         error_code: Optional[str] = None,
         details: Optional[Dict[str, Any]] = None,
     ):
         self.message = message
-        self.status_code = status_code
-        self.error_code = error_code or self.__class__.__name__
-        self.details = details or {}
+        # В экземпляр записываем только переопределения
+        if status_code is not None:
+            self.status_code = status_code
+        if error_code:
+            self.error_code = error_code
+        elif self.error_code is None:
+            self.error_code = self.__class__.__name__
+        if details:
+            self.details = details
         super().__init__(self.message)
 
 
@@ -22,44 +37,59 @@ class BaseAppException(Exception):
 class AuthenticationError(BaseAppException):
     """Ошибка аутентификации"""
 
+    status_code = 401
+    error_code = "AUTHENTICATION_ERROR"
+
     def __init__(
         self,
         message: str = "Authentication failed",
         details: Optional[Dict[str, Any]] = None,
     ):
-        super().__init__(message, 401, "AUTHENTICATION_ERROR", details)
+        super().__init__(message, details=details)
 
 
 class AuthorizationError(BaseAppException):
     """Ошибка авторизации"""
 
+    status_code = 403
+    error_code = "AUTHORIZATION_ERROR"
+
     def __init__(
         self, message: str = "Access denied", details: Optional[Dict[str, Any]] = None
     ):
-        super().__init__(message, 403, "AUTHORIZATION_ERROR", details)
+        super().__init__(message, details=details)
 
 
 # === Ошибки валидации ===
 class ValidationError(BaseAppException):
     """Ошибка валидации данных"""
 
+    status_code = 400
+    error_code = "VALIDATION_ERROR"
+
     def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
-        super().__init__(message, 400, "VALIDATION_ERROR", details)
+        super().__init__(message, details=details)
 
 
 class DuplicateError(BaseAppException):
     """Ошибка дублирования данных"""
 
+    status_code = 409
+    error_code = "DUPLICATE_ERROR"
+
     def __init__(self, resource: str, field: str, value: str):
         message = f"{resource} with {field} '{value}' already exists"
         details = {"resource": resource, "field": field, "value": value}
-        super().__init__(message, 409, "DUPLICATE_ERROR", details)
+        super().__init__(message, details=details)
 
 
 # === Ошибки ресурсов ===
 class NotFoundError(BaseAppException):
     """Ресурс не найден"""
 
+    status_code = 404
+    error_code = "NOT_FOUND"
+
     def __init__(self, resource: str, identifier: str = None):
         if identifier:
             message = f"{resource} with identifier '{identifier}' not found"
@@ -67,15 +97,18 @@ class NotFoundError(BaseAppException):
         else:
             message = f"{resource} not found"
             details = {"resource": resource}
-        super().__init__(message, 404, "NOT_FOUND", details)
+        super().__init__(message, details=details)
 
 
 # === Бизнес-логика ===
 class BusinessLogicError(BaseAppException):
     """Ошибка бизнес-логики"""
 
+    status_code = 400
+    error_code = "BUSINESS_LOGIC_ERROR"
+
     def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
-        super().__init__(message, 400, "BUSINESS_LOGIC_ERROR", details)
+        super().__init__(message, details=details)
 
 
 class LimitExceededError(BusinessLogicError):
@@ -90,61 +123,79 @@ class LimitExceededError(BusinessLogicError):
 class PermissionDeniedError(BaseAppException):
     """Отказано в доступе к ресурсу"""
 
+    status_code = 403
+    error_code = "PERMISSION_DENIED"
+
     def __init__(self, action: str, resource: str, reason: str = None):
         message = f"Permission denied: cannot {action} {resource}"
         if reason:
             message += f" - {reason}"
         details = {"action": action, "resource": resource, "reason": reason}
-        super().__init__(message, 403, "PERMISSION_DENIED", details)
+        super().__init__(message, details=details)
 
 
 # === Ошибки базы данных ===
 class DatabaseError(BaseAppException):
     """Ошибка базы данных"""
 
+    status_code = 500
+    error_code = "DATABASE_ERROR"
+
     def __init__(
         self,
         message: str = "Database operation failed",
         details: Optional[Dict[str, Any]] = None,
     ):
-        super().__init__(message, 500, "DATABASE_ERROR", details)
+        super().__init__(message, details=details)
 
 
 class DatabaseConnectionError(BaseAppException):
     """Ошибка подключения к базе данных"""
 
+    status_code = 503
+    error_code = "DATABASE_CONNECTION_ERROR"
+
     def __init__(self, message: str = "Database connection failed"):
-        super().__init__(message, 503, "DATABASE_CONNECTION_ERROR")
+        super().__init__(message)
 
 
 class DatabaseTimeoutError(BaseAppException):
     """Таймаут операции с базой данных"""
 
+    status_code = 504
+    error_code = "DATABASE_TIMEOUT"
+
     def __init__(self, operation: str, timeout: int):
         message = f"Database operation '{operation}' timed out after {timeout}s"
         details = {"operation": operation, "timeout": timeout}
-        super().__init__(message, 504, "DATABASE_TIMEOUT", details)
+        super().__init__(message, details=details)
 
 
 class DatabaseIntegrityError(BaseAppException):
     """Ошибка целостности данных"""
 
+    status_code = 409
+    error_code = "DATABASE_INTEGRITY_ERROR"
+
     def __init__(self, constraint: str, details: Optional[Dict[str, Any]] = None):
         message = f"Database integrity constraint violated: {constraint}"
         error_details = {"constraint": constraint}
         if details:
             error_details.update(details)
-        super().__init__(message, 409, "DATABASE_INTEGRITY_ERROR", error_details)
+        super().__init__(message, details=error_details)
 
 
 # === Ошибки внешних сервисов ===
 class ExternalServiceError(BaseAppException):
     """Ошибка внешнего сервиса"""
 
+    status_code = 502
+    error_code = "EXTERNAL_SERVICE_ERROR"
+
     def __init__(self, service: str, message: str = None):
         message = message or f"External service '{service}' error"
         details = {"service": service}
-        super().__init__(message, 502, "EXTERNAL_SERVICE_ERROR", details)
+        super().__init__(message, details=details)
 
 
 class TelegramAuthError(ExternalServiceError):
@@ -158,9 +209,12 @@ class TelegramAuthError(ExternalServiceError):
 class ConfigurationError(BaseAppException):
     """Ошибка конфигурации"""
 
+    status_code = 500
+    error_code = "CONFIGURATION_ERROR"
+
     def __init__(self, parameter: str, message: str = None):
         message = (
             message or f"Configuration parameter '{parameter}' is invalid or missing"
         )
         details = {"parameter": parameter}
-        super().__init__(message, 500, "CONFIGURATION_ERROR", details)
+        super().__init__(message, details=details)
@@ -1,76 +1,119 @@
 import asyncio
 import logging
-
-from sqlalchemy import select, func, text
-from app.core.database import async_session, DatabaseManager, db_operation, engine, Base
+from sqlalchemy import bindparam, exists, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.database import async_session, DatabaseManager, db_operation, engine
+from app.core.config import settings
 from app.core.exceptions import DatabaseError, ConfigurationError
 from app.staff.models.roles import Role, RoleType
 
 logger = logging.getLogger(__name__)
 db_manager = DatabaseManager()
 
-
-async def run_migrations():
-    """Run pending database migrations (adds missing columns)"""
-    migrations = [
-        # Add features column to tariffs table
-        {
-            "name": "add_tariffs_features_column",
-            "check": "SELECT column_name FROM information_schema.columns WHERE table_name='tariffs' AND column_name='features'",
-            "apply": "ALTER TABLE tariffs ADD COLUMN features JSONB NOT NULL DEFAULT '[]'",
-        },
-        # Add freeze_days_total column to tariffs table
-        {
-            "name": "add_tariffs_freeze_days_total_column",
-            "check": "SELECT column_name FROM information_schema.columns WHERE table_name='tariffs' AND column_name='freeze_days_total'",
-            "apply": "ALTER TABLE tariffs ADD COLUMN freeze_days_total INTEGER NOT NULL DEFAULT 0",
-        },
-        # Add 'scheduled' value to enrollmentstatus enum
-        {
-            "name": "add_scheduled_to_enrollmentstatus_enum",
-            "check": "SELECT 1 FROM pg_enum WHERE enumlabel = 'scheduled' AND enumtypid = (SELECT oid FROM pg_type WHERE typname = 'enrollmentstatus')",
-            "apply": "ALTER TYPE enrollmentstatus ADD VALUE IF NOT EXISTS 'scheduled'",
-        },
-        # Add deleted_at column to tariffs table for soft delete
-        {
-            "name": "add_tariffs_deleted_at_column",
-            "check": "SELECT column_name FROM information_schema.columns WHERE table_name='tariffs' AND column_name='deleted_at'",
-            "apply": "ALTER TABLE tariffs ADD COLUMN deleted_at TIMESTAMP WITH TIME ZONE NULL",
-        },
-        # Add index on deleted_at column
-        {
-            "name": "add_tariffs_deleted_at_index",
-            "check": "SELECT indexname FROM pg_indexes WHERE tablename='tariffs' AND indexname='ix_tariffs_deleted_at'",
-            "apply": "CREATE INDEX ix_tariffs_deleted_at ON tariffs(deleted_at)",
-        },
-    ]
-    
-    async with engine.begin() as conn:
-        for migration in migrations:
-            try:
+# Результаты проверок, неизменные до конца жизни процесса
+# (сбрасываются в reset_database)
+_init_state = {"verified": False, "roles_seeded": False}
+
+# Миграции: колонки задаются парой (table, column), остальное - SQL проверкой
+_MIGRATIONS = [
+    # Add features column to tariffs table
+    {
+        "name": "add_tariffs_features_column",
+        "column": ("tariffs", "features"),
+        "apply": "ALTER TABLE tariffs ADD COLUMN features JSONB NOT NULL DEFAULT '[]'",
+    },
+    # Add freeze_days_total column to tariffs table
+    {
+        "name": "add_tariffs_freeze_days_total_column",
+        "column": ("tariffs", "freeze_days_total"),
+        "apply": "ALTER TABLE tariffs ADD COLUMN freeze_days_total INTEGER NOT NULL DEFAULT 0",
+    },
+    # Add 'scheduled' value to enrollmentstatus enum
+    {
+        "name": "add_scheduled_to_enrollmentstatus_enum",
+        "target": "enrollmentstatus",
+        "check": "SELECT 1 FROM pg_enum WHERE enumlabel = 'scheduled' AND enumtypid = (SELECT oid FROM pg_type WHERE typname = 'enrollmentstatus')",
+        "apply": "ALTER TYPE enrollmentstatus ADD VALUE IF NOT EXISTS 'scheduled'",
+    },
+    # Add deleted_at column to tariffs table for soft delete
+    {
+        "name": "add_tariffs_deleted_at_column",
+        "column": ("tariffs", "deleted_at"),
+        "apply": "ALTER TABLE tariffs ADD COLUMN deleted_at TIMESTAMP WITH TIME ZONE NULL",
+    },
+    # Add index on deleted_at column
+    {
+        "name": "add_tariffs_deleted_at_index",
+        "target": "tariffs",
+        "check": "SELECT indexname FROM pg_indexes WHERE tablename='tariffs' AND indexname='ix_tariffs_deleted_at'",
+        "apply": "CREATE INDEX ix_tariffs_deleted_at ON tariffs(deleted_at)",
+    },
+]
+
+# Колонки проверяем одним запросом к information_schema вместо запроса
+# на каждую миграцию; выражение собирается один раз при импорте
+_COLUMN_PAIRS = [m["column"] for m in _MIGRATIONS if "column" in m]
+_COLUMNS_CHECK_STMT = text(
+    "SELECT table_name, column_name FROM information_schema.columns "
+    "WHERE (table_name::text, column_name::text) IN :pairs"
+).bindparams(bindparam("pairs", expanding=True))
+
+# Запросы по ролям строятся один раз; скомпилированная форма берется из кэша
+# SQLAlchemy
+_ROLES_EXIST_STMT = select(exists().select_from(Role))
+_EXPECTED_ROLES_STMT = select(Role.code).where(Role.code.in_(list(RoleType)))
+
+
+async def _fetch_existing_columns(conn: AsyncConnection) -> set:
+    """Пары (table, column), уже присутствующие в схеме"""
+    result = await conn.execute(_COLUMNS_CHECK_STMT, {"pairs": _COLUMN_PAIRS})
+    return {(table, column) for table, column in result}
+
+
+async def _apply_migrations(conn: AsyncConnection, migrations, existing_columns):
+    """Применить миграции по порядку; каждая в своем SAVEPOINT"""
+    for migration in migrations:
+        try:
+            # Ошибка одной миграции откатывает только ее SAVEPOINT
+            async with conn.begin_nested():
                 # Check if migration is needed
-                result = await conn.execute(text(migration["check"]))
-                exists = result.fetchone() is not None
-                
-                if not exists:
+                if "column" in migration:
+                    applied = migration["column"] in existing_columns
+                else:
+                    result = await conn.execute(text(migration["check"]))
+                    applied = result.first() is not None
+
+                if not applied:
                     logger.info(f"Applying migration: {migration['name']}")
                     await conn.execute(text(migration["apply"]))
                     logger.info(f"✅ Migration applied: {migration['name']}")
                 else:
                     logger.debug(f"Migration already applied: {migration['name']}")
-            except Exception as e:
-                logger.warning(f"Migration {migration['name']} skipped: {e}")
+        except Exception as e:
+            logger.warning(f"Migration {migration['name']} skipped: {e}")
+
+
+async def run_migrations(conn: AsyncConnection):
+    """Run pending database migrations (adds missing columns)"""
+    # В общей транзакции bootstrap миграции идут по порядку на этом соединении
+    existing_columns = await _fetch_existing_columns(conn)
+    await _apply_migrations(conn, _MIGRATIONS, existing_columns)
 
 
 @db_operation
-async def create_initial_roles():
+async def create_initial_roles(conn: AsyncConnection):
     """Create initial roles if they don't exist"""
-    async with async_session() as session:
+    if _init_state["roles_seeded"]:
+        return
+
+    # Сессия на переданном соединении присоединяется к его транзакции,
+    # фиксирует ее вызывающий код
+    async with async_session(bind=conn) as session:
         try:
-            result = await session.execute(select(Role))
-            existing_roles = result.scalars().all()
+            # Проверяем наличие хотя бы одной роли, не загружая строки
+            roles_exist = await session.scalar(_ROLES_EXIST_STMT)
 
-            if not existing_roles:
+            if not roles_exist:
                 logger.info("Creating initial roles...")
 
                 roles_data = [
@@ -79,16 +122,11 @@ async def create_initial_roles():
                     {"code": RoleType.owner, "name": "Owner"},
                 ]
 
-                for role_data in roles_data:
-                    role = Role(**role_data)
-                    session.add(role)
-
-                await session.commit()
+                # Один INSERT со всеми строками (executemany)
+                await session.execute(insert(Role), roles_data)
                 logger.info("Initial roles created successfully")
             else:
-                logger.info(
-                    f"Roles already exist ({len(existing_roles)} found), skipping creation"
-                )
+                logger.info("Roles already exist, skipping creation")
 
         except Exception as e:
             logger.error(f"Failed to create initial roles: {e}")
@@ -101,21 +139,24 @@ async def init_database():
     try:
         logger.info("Starting database initialization...")
 
-        # Проверяем соединение с базой данных
-        await db_manager.check_connection()
-        logger.info("✅ Database connection verified")
+        # Весь bootstrap выполняется на одном соединении в одной транзакции
+        async with engine.begin() as conn:
+            # Create all tables
+            await db_manager.create_tables(conn)
+            logger.info("✅ Database tables created/verified")
 
-        # Create all tables with retry mechanism
-        await db_manager.create_tables()
-        logger.info("✅ Database tables created/verified")
+            # Run pending migrations (add missing columns, etc.)
+            await run_migrations(conn)
+            logger.info("✅ Database migrations checked/applied")
 
-        # Run pending migrations (add missing columns, etc.)
-        await run_migrations()
-        logger.info("✅ Database migrations checked/applied")
+            # Create initial data
+            await create_initial_roles(conn)
+            logger.info("✅ Initial data created/verified")
 
-        # Create initial data
-        await create_initial_roles()
-        logger.info("✅ Initial data created/verified")
+        # Флаги выставляются только после успешного COMMIT: при откате
+        # повторная инициализация в этом процессе выполнит шаги заново
+        db_manager.mark_tables_created()
+        _init_state["roles_seeded"] = True
 
         logger.info("🎉 Database initialization completed successfully")
 
@@ -129,20 +170,27 @@ async def init_database():
 
 async def verify_database_setup():
     """Verify that database is properly set up"""
+    if _init_state["verified"]:
+        return True
+
     try:
         logger.info("Verifying database setup...")
 
         async with async_session() as session:
             # Проверяем наличие ролей
 
-            roles_count = await session.execute(select(func.count(Role.id)))
-            count = roles_count.scalar()
+            result = await session.execute(_EXPECTED_ROLES_STMT)
+            found_roles = set(result.scalars().all())
 
-            expected_roles = len(RoleType)
-            if count != expected_roles:
-                raise DatabaseError(f"Expected {expected_roles} roles, found {count}")
+            missing_roles = set(RoleType) - found_roles
+            if missing_roles:
+                missing = ", ".join(sorted(role.value for role in missing_roles))
+                raise DatabaseError(f"Missing roles: {missing}")
 
-            logger.info(f"✅ Database verification passed: {count} roles found")
+            logger.info(
+                f"✅ Database verification passed: {len(found_roles)} roles found"
+            )
+            _init_state["verified"] = True
             return True
 
     except Exception as e:
@@ -152,10 +200,7 @@ async def verify_database_setup():
 
 async def reset_database():
     """Reset database (for development/testing only)"""
-    import os
-
-    environment = os.getenv("ENVIRONMENT", "production").lower()
-    if environment not in ["development", "dev", "test"]:
+    if settings.environment not in ["development", "dev", "test"]:
         raise ConfigurationError(
             "ENVIRONMENT",
             "Database reset is only allowed in development or test environments",
@@ -165,8 +210,9 @@ async def reset_database():
         logger.warning("🚨 RESETTING DATABASE - ALL DATA WILL BE LOST!")
 
         # Drop all tables
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.drop_all)
+        await db_manager.drop_tables()
+        _init_state["verified"] = False
+        _init_state["roles_seeded"] = False
 
         logger.info("✅ All tables dropped")
 
@@ -200,8 +246,16 @@ if __name__ == "__main__":
         else:
             await init_database()
 
+    # uvloop уже есть в зависимостях; без него работаем на стандартном цикле
+    try:
+        import uvloop
+
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
+
     try:
-        asyncio.run(main())
+        run(main())
     except KeyboardInterrupt:
         logger.info("Database initialization cancelled by user")
     except Exception as e:
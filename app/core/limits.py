@@ -2,17 +2,24 @@ from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+
+from app.core.config import settings
 
 # Create limiter instance
+# По умолчанию счетчики хранятся в памяти процесса, то есть отдельно в каждом
+# воркере. Общий лимит на все воркеры: RATE_LIMIT_STORAGE_URI=redis://...
+# (нужен пакет redis)
 limiter = Limiter(
-    key_func=get_remote_address, default_limits=["200/day", "50/hour"]  # Global limits
+    key_func=get_remote_address,
+    default_limits=["200/day", "50/hour"],  # Global limits
+    storage_uri=settings.rate_limit_storage_uri,
 )
 
 
 # Custom rate limit error handler
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    response = JSONResponse(
+    response = ORJSONResponse(
         status_code=429,
         content={
             "error": "Rate limit exceeded",
@@ -1,27 +1,97 @@
+import atexit
 import logging
+import queue
 import time
-from typing import Any, Dict
+from logging.handlers import QueueHandler, QueueListener
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from itertools import islice
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
 import json
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Общий пустой контекст для ошибок без context
+_EMPTY_CONTEXT = MappingProxyType({})
 
-def setup_logging(log_level: str = "INFO", log_format: str = "text"):
+# Поля текущего HTTP запроса (request_id, method, path): выставляются в
+# ObservabilityMiddleware и попадают во все логи, записанные при его обработке,
+# без передачи через extra
+log_context_ctx: ContextVar[Mapping[str, Any]] = ContextVar(
+    "log_context", default=_EMPTY_CONTEXT
+)
+
+# Стандартные атрибуты LogRecord (и те, что добавляет Formatter): все остальное
+# в record.__dict__ пришло из extra
+_LOGRECORD_STANDARD_ATTRS = frozenset(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))
+) | {"message", "asctime"}
+
+
+# Параметры последней настройки логирования (None - еще не настраивалось)
+_configured = None
+
+# Поток, который форматирует и пишет записи из очереди
+_listener: Optional[QueueListener] = None
+
+
+class _ContextQueueHandler(QueueHandler):
+    """
+    QueueHandler для очереди внутри процесса: запись не копируется и не
+    форматируется, фиксируются только сообщение и контекст запроса
+    """
+
+    def prepare(self, record):
+        # Аргументы могут измениться до того, как запись дойдет до потока
+        record.msg = record.getMessage()
+        record.args = None
+
+        # ContextVar в потоке listener недоступен - переносим поля в запись,
+        # не перезаписывая переданные через extra
+        fields = record.__dict__
+        for key, value in log_context_ctx.get().items():
+            if key not in fields:
+                fields[key] = value
+        return record
+
+
+def _stop_listener():
+    """Остановить listener, дописав оставшиеся в очереди записи"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# При выходе из процесса дописываем записи, оставшиеся в очереди
+atexit.register(_stop_listener)
+
+
+def setup_logging(
+    log_level: str = "INFO", log_format: str = "text", force: bool = False
+):
     """
     Настройка системы логирования
 
     Args:
         log_level: Уровень логирования (DEBUG, INFO, WARNING, ERROR)
         log_format: Формат логов (text, json)
+        force: Перенастроить, даже если параметры не изменились
     """
+    global _configured, _listener
+
+    # Повторный вызов с теми же параметрами ничего не меняет
+    if not force and _configured == (log_level, log_format):
+        return
 
-    # Создаем форматтер
+    # Форматтеры общие для всех вызовов
     if log_format.lower() == "json":
-        formatter = JsonFormatter()
+        formatter = _JSON_FORMATTER
     else:
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
+        formatter = _TEXT_FORMATTER
 
     # Настраиваем root logger
     root_logger = logging.getLogger()
@@ -30,25 +100,50 @@ def setup_logging(log_level: str = "INFO", log_format: str = "text"):
     # Удаляем существующие handlers
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    _stop_listener()
 
-    # Добавляем console handler
+    # Console handler пишет из отдельного потока: event loop только кладет
+    # запись в очередь и не блокируется на форматировании и выводе
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(_ContextQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+    _listener.start()
 
     # Настраиваем уровни для специфичных логгеров
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 
-    logger.info(f"Logging configured: level={log_level}, format={log_format}")
+    _configured = (log_level, log_format)
+    logger.info("Logging configured: level=%s, format=%s", log_level, log_format)
 
 
 class JsonFormatter(logging.Formatter):
     """JSON форматтер для структурированного логирования"""
 
+    # (секунда, "YYYY-MM-DDTHH:MM:SS") последней записи: кортеж заменяется
+    # целиком, поэтому чтение из разных потоков не видит его наполовину
+    _second_cache = (None, "")
+
+    def _format_timestamp(self, created: float) -> str:
+        """ISO-8601 в UTC с миллисекундами, дата и время форматируются раз в секунду"""
+        second = int(created)
+        # Округление до микросекунд как в datetime.fromtimestamp
+        micros = round((created - second) * 1_000_000)
+        if micros == 1_000_000:
+            second += 1
+            micros = 0
+        cached_second, prefix = self._second_cache
+        if cached_second != second:
+            prefix = datetime.fromtimestamp(second, timezone.utc).isoformat()[:19]
+            self._second_cache = (second, prefix)
+        return f"{prefix}.{micros // 1000:03d}+00:00"
+
     def format(self, record):
         log_entry = {
-            "timestamp": self.formatTime(record),
+            "timestamp": self._format_timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -57,77 +152,58 @@ class JsonFormatter(logging.Formatter):
             "line": record.lineno,
         }
 
+        # Поля контекста запроса (при записи через очередь уже лежат в record)
+        log_entry.update(log_context_ctx.get())
+
         # Добавляем дополнительные поля из extra
-        if hasattr(record, "__dict__"):
-            for key, value in record.__dict__.items():
-                if key not in [
-                    "name",
-                    "msg",
-                    "args",
-                    "levelname",
-                    "levelno",
-                    "pathname",
-                    "filename",
-                    "module",
-                    "exc_info",
-                    "exc_text",
-                    "stack_info",
-                    "lineno",
-                    "funcName",
-                    "created",
-                    "msecs",
-                    "relativeCreated",
-                    "thread",
-                    "threadName",
-                    "processName",
-                    "process",
-                    "getMessage",
-                ]:
-                    try:
-                        # Пытаемся сериализовать значение
-                        json.dumps(value)
-                        log_entry[key] = value
-                    except (TypeError, ValueError):
-                        log_entry[key] = str(value)
+        for key, value in record.__dict__.items():
+            if key not in _LOGRECORD_STANDARD_ATTRS:
+                log_entry[key] = value
 
         # Добавляем exception info если есть
         if record.exc_info:
             log_entry["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_entry, ensure_ascii=False)
+        # Несериализуемые значения extra orjson приводит к строке через default
+        try:
+            return orjson.dumps(
+                log_entry, default=str, option=orjson.OPT_NON_STR_KEYS
+            ).decode()
+        except TypeError:
+            # Например, целые за пределами 64 бит
+            return json.dumps(log_entry, ensure_ascii=False, default=str)
+
+
+_JSON_FORMATTER = JsonFormatter()
+_TEXT_FORMATTER = logging.Formatter(
+    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
 
 
 class ErrorTracker:
     """Класс для отслеживания ошибок и их статистики"""
 
     def __init__(self):
-        self.error_counts = {}
-        self.last_errors = []
         self.max_history = 100
+        self.error_counts = Counter()
+        # deque с maxlen сам вытесняет старые записи за O(1)
+        self.last_errors = deque(maxlen=self.max_history)
 
     def track_error(
         self, error_type: str, error_message: str, context: Dict[str, Any] = None
     ):
         """Отследить ошибку"""
         # Увеличиваем счетчик
-        self.error_counts[error_type] = self.error_counts.get(error_type, 0) + 1
-
-        # Добавляем в историю
-        error_entry = {
-            "timestamp": time.time(),
-            "type": error_type,
-            "message": error_message,
-            "context": context or {},
-        }
+        self.error_counts[error_type] += 1
 
-        self.last_errors.append(error_entry)
-
-        # Ограничиваем размер истории
-        if len(self.last_errors) > self.max_history:
-            self.last_errors = self.last_errors[-self.max_history :]
+        # Добавляем в историю кортежем, словари строятся только в get_stats
+        self.last_errors.append(
+            (time.time(), error_type, error_message, context or _EMPTY_CONTEXT)
+        )
 
         logger.warning(
-            f"Error tracked: {error_type}",
+            "Error tracked: %s",
+            error_type,
             extra={
                 "error_type": error_type,
                 "error_message": error_message,
@@ -139,10 +215,21 @@ class ErrorTracker:
     def get_stats(self) -> Dict[str, Any]:
         """Получить статистику ошибок"""
         return {
-            "error_counts": self.error_counts.copy(),
+            "error_counts": dict(self.error_counts),
             "total_errors": sum(self.error_counts.values()),
             "unique_error_types": len(self.error_counts),
-            "last_errors": self.last_errors[-10:],  # Последние 10 ошибок
+            # Последние 10 ошибок
+            "last_errors": [
+                {
+                    "timestamp": timestamp,
+                    "type": error_type,
+                    "message": error_message,
+                    "context": dict(context),
+                }
+                for timestamp, error_type, error_message, context in islice(
+                    self.last_errors, max(len(self.last_errors) - 10, 0), None
+                )
+            ],
         }
 
     def reset_stats(self):
@@ -181,8 +268,13 @@ def log_business_event(
         entity_id: ID сущности
         details: Дополнительные детали
     """
+    # Сообщение и extra собираем только если INFO не отфильтрован
+    if not logger.isEnabledFor(logging.INFO):
+        return
+
     logger.info(
-        f"Business event: {event}",
+        "Business event: %s",
+        event,
         extra={
             "event": event,
             "entity_type": entity_type,
@@ -1,280 +1,398 @@
 import time
 import logging
-import uuid
 import os
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+import random
+from itertools import count
+from typing import Iterable, Mapping
+from starlette.datastructures import Headers
+from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.core.logging_utils import error_tracker
+from app.core.config import settings
+from app.core.logging_utils import error_tracker, log_context_ctx
 
 logger = logging.getLogger(__name__)
 
-
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+# ID запроса: 4 hex случайного префикса процесса + 4 hex счетчика
+_REQUEST_ID_PREFIX = os.urandom(2).hex()
+_request_counter = count()
+
+# Служебные endpoints, которые не логируются
+_DEFAULT_EXCLUDE_PATHS = frozenset({"/health", "/docs", "/openapi.json", "/redoc"})
+
+_SWAGGER_PATHS = ("/docs", "/redoc", "/openapi.json")
+
+# Предел кэшей CORS ответов: ключ содержит заголовки, пришедшие от клиента
+_CORS_CACHE_SIZE = 256
+
+# CORS заголовки ответа: если приложение выставило их само, заголовки
+# объединяются стандартной логикой CORSMiddleware
+_CORS_RESPONSE_HEADERS = frozenset(
+    {
+        b"vary",
+        b"access-control-allow-origin",
+        b"access-control-allow-credentials",
+        b"access-control-expose-headers",
+    }
+)
+
+# Security headers в виде готовых байтовых пар ASGI, кодируются один раз
+_BASE_SECURITY_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+)
+_SWAGGER_SECURITY_HEADERS = _BASE_SECURITY_HEADERS + (
+    (
+        b"content-security-policy",
+        b"default-src 'self'; "
+        b"script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+        b"style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+        b"img-src 'self' data: https: https://fastapi.tiangolo.com; "
+        b"font-src 'self' https://cdn.jsdelivr.net; "
+        b"connect-src 'self'",
+    ),
+)
+_DEV_SECURITY_HEADERS = _BASE_SECURITY_HEADERS + (
+    (
+        b"content-security-policy",
+        b"default-src 'self'; "
+        b"script-src 'self' 'unsafe-inline'; "
+        b"style-src 'self' 'unsafe-inline'; "
+        b"img-src 'self' data: https:; "
+        b"font-src 'self'; "
+        b"connect-src 'self'",
+    ),
+)
+_PROD_SECURITY_HEADERS = _BASE_SECURITY_HEADERS + (
+    (
+        b"content-security-policy",
+        b"default-src 'self'; "
+        b"script-src 'self'; "
+        b"style-src 'self'; "
+        b"img-src 'self' data:; "
+        b"font-src 'self'; "
+        b"connect-src 'self'; "
+        b"object-src 'none'; "
+        b"base-uri 'self'",
+    ),
+)
+
+
+class ObservabilityMiddleware:
     """
-    Middleware для автоматического логирования HTTP запросов
+    Единый middleware наблюдаемости: request ID и логирование, security
+    headers, мониторинг производительности и отслеживание ошибок за один
+    ASGI-проход
     """
 
-    def __init__(self, app: ASGIApp, exclude_paths: list = None):
-        super().__init__(app)
-        self.exclude_paths = exclude_paths or [
-            "/health",
-            "/docs",
-            "/openapi.json",
-            "/redoc",
-        ]
+    def __init__(
+        self,
+        app: ASGIApp,
+        exclude_paths: Iterable[str] = None,
+        slow_request_threshold: float = 1.0,
+        noisy_paths: Mapping[str, float] = None,
+    ):
+        self.app = app
+        # frozenset: проверка пути за O(1) на каждый запрос
+        self.exclude_paths = frozenset(exclude_paths or _DEFAULT_EXCLUDE_PATHS)
+        # Частые endpoints: путь -> доля запросов, которые логируются
+        self.noisy_paths = dict(noisy_paths or {})
+        self.slow_request_threshold = slow_request_threshold  # секунды
+        # Development: более мягкие правила CSP
+        self.default_headers = (
+            _DEV_SECURITY_HEADERS if settings.debug else _PROD_SECURITY_HEADERS
+        )
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Пропускаем служебные endpoints
-        if request.url.path in self.exclude_paths:
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Пропускаем не-HTTP соединения
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # Генерируем уникальный ID запроса
-        request_id = str(uuid.uuid4())[:8]
-        start_time = time.time()
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
 
-        # Добавляем request_id в request state для использования в других местах
-        request.state.request_id = request_id
+        # Специальная обработка для Swagger UI endpoints
+        if path.startswith(_SWAGGER_PATHS):
+            security_headers = _SWAGGER_SECURITY_HEADERS
+        else:
+            security_headers = self.default_headers
+
+        # Служебные endpoints не логируются и не получают request ID
+        logged = path not in self.exclude_paths
+        if logged:
+            # Генерируем уникальный ID запроса
+            request_id = f"{_REQUEST_ID_PREFIX}{next(_request_counter) & 0xFFFF:04x}"
+            # Добавляем request_id в request state для использования в других местах
+            scope.setdefault("state", {})["request_id"] = request_id
+            # Общие поля логов запроса собираются один раз
+            base_extra = {"request_id": request_id, "method": method, "path": path}
+            # X-Request-ID добавляется вместе с security headers
+            response_headers = (
+                *security_headers,
+                (b"x-request-id", request_id.encode("latin-1")),
+            )
+        else:
+            base_extra = {"method": method, "path": path}
+            response_headers = security_headers
+
+        # Общие поля попадают в логи из контекста, в том числе в логи
+        # обработчиков, поэтому в extra передаются только поля конкретной записи
+        token = log_context_ctx.set(base_extra)
+
+        # Уровень проверяем один раз: при WARNING и выше заголовки не разбираются
+        # и extra для INFO логов не собираются
+        log_info = logged and logger.isEnabledFor(logging.INFO)
+        if log_info:
+            # Для частых endpoints логируется только выборка запросов,
+            # request ID при этом выставляется всегда
+            sample_rate = self.noisy_paths.get(path)
+            if sample_rate is not None and random.random() >= sample_rate:
+                log_info = False
 
         # Логируем начало запроса
-        logger.info(
-            f"Request started: {request.method} {request.url.path}",
-            extra={
-                "request_id": request_id,
-                "method": request.method,
-                "path": request.url.path,
-                "query_params": (
-                    str(request.query_params) if request.query_params else None
-                ),
-                "client_ip": self._get_client_ip(request),
-                "user_agent": request.headers.get("user-agent"),
-                "content_type": request.headers.get("content-type"),
-            },
-        )
+        if log_info:
+            headers = Headers(scope=scope)
+            query_string = scope.get("query_string")
+            logger.info(
+                "Request started: %s %s",
+                method,
+                path,
+                extra={
+                    "query_params": (
+                        query_string.decode("latin-1") if query_string else None
+                    ),
+                    "client_ip": self._get_client_ip(scope),
+                    "user_agent": headers.get("user-agent"),
+                    "content_type": headers.get("content-type"),
+                },
+            )
+
+        status_code = None
+        response_size = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                raw_headers = message.get("headers", ())
+                if log_info:
+                    # Размер ответа берем из сырых заголовков без обертки Headers
+                    for name, value in raw_headers:
+                        if name == b"content-length":
+                            response_size = value.decode("latin-1")
+                            break
+                # Все заголовки уже закодированы, добавляем их одной конкатенацией
+                message["headers"] = [*raw_headers, *response_headers]
+
+                # Отслеживаем HTTP ошибки (4xx, 5xx)
+                if status_code >= 400:
+                    client = scope.get("client")
+                    error_tracker.track_error(
+                        error_type=f"HTTP_{status_code}",
+                        error_message=f"HTTP {status_code} response",
+                        context={
+                            "method": method,
+                            "path": path,
+                            "status_code": status_code,
+                            "client_ip": client[0] if client else None,
+                        },
+                    )
+            await send(message)
 
         try:
             # Выполняем запрос
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
 
             # Вычисляем время выполнения
-            duration = time.time() - start_time
+            duration_ms = round((time.perf_counter() - start_time) * 1000, 2)
 
             # Логируем завершение запроса
-            logger.info(
-                f"Request completed: {request.method} {request.url.path}",
-                extra={
-                    "request_id": request_id,
-                    "method": request.method,
-                    "path": request.url.path,
-                    "status_code": response.status_code,
-                    "duration_ms": round(duration * 1000, 2),
-                    "response_size": response.headers.get("content-length"),
-                },
-            )
-
-            # Добавляем request_id в response headers для трассировки
-            response.headers["X-Request-ID"] = request_id
+            if log_info:
+                logger.info(
+                    "Request completed: %s %s",
+                    method,
+                    path,
+                    extra={
+                        "status_code": status_code,
+                        "duration_ms": duration_ms,
+                        "response_size": response_size,
+                    },
+                )
 
-            return response
+            # Логируем медленные запросы
+            if duration_ms > self.slow_request_threshold * 1000:
+                logger.warning(
+                    "Slow request detected: %s %s",
+                    method,
+                    path,
+                    extra={
+                        "duration_ms": duration_ms,
+                        "threshold_ms": self.slow_request_threshold * 1000,
+                        "status_code": status_code,
+                        "category": "performance",
+                    },
+                )
 
         except Exception as e:
-            duration = time.time() - start_time
+            duration_ms = round((time.perf_counter() - start_time) * 1000, 2)
+            error_type = type(e).__name__
 
             # Логируем ошибку
             logger.error(
-                f"Request failed: {request.method} {request.url.path}",
+                "Request failed: %s %s",
+                method,
+                path,
                 extra={
-                    "request_id": request_id,
-                    "method": request.method,
-                    "path": request.url.path,
-                    "duration_ms": round(duration * 1000, 2),
-                    "error_type": type(e).__name__,
+                    "duration_ms": duration_ms,
+                    "error_type": error_type,
                     "error_message": str(e),
+                    "category": "performance",
                 },
             )
 
-            # Отслеживаем ошибку
+            # Отслеживаем необработанное исключение
+            client = scope.get("client")
             error_tracker.track_error(
-                error_type=type(e).__name__,
+                error_type=f"UNHANDLED_{error_type}",
                 error_message=str(e),
                 context={
-                    "request_id": request_id,
-                    "method": request.method,
-                    "path": request.url.path,
-                    "duration_ms": round(duration * 1000, 2),
+                    **base_extra,
+                    "duration_ms": duration_ms,
+                    "client_ip": client[0] if client else None,
                 },
             )
 
             # Перебрасываем исключение для обработки error handlers
             raise
 
-    def _get_client_ip(self, request: Request) -> str:
+        finally:
+            log_context_ctx.reset(token)
+
+    @staticmethod
+    def _get_client_ip(scope: Scope) -> str:
         """Получить IP клиента с учетом proxy"""
-        # Проверяем заголовки от прокси
-        forwarded_for = request.headers.get("x-forwarded-for")
-        if forwarded_for:
-            # Берем первый IP из списка
-            return forwarded_for.split(",")[0].strip()
+        # Один проход по сырым заголовкам: X-Forwarded-For имеет приоритет,
+        # X-Real-IP запоминаем до конца списка
+        real_ip = None
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                # Берем первый IP из списка
+                forwarded_for = value.split(b",", 1)[0].strip()
+                if forwarded_for:
+                    return forwarded_for.decode("latin-1")
+            elif name == b"x-real-ip" and real_ip is None and value:
+                real_ip = value
 
-        real_ip = request.headers.get("x-real-ip")
         if real_ip:
-            return real_ip
+            return real_ip.decode("latin-1")
 
         # Fallback на прямой IP
-        return request.client.host if request.client else "unknown"
+        client = scope.get("client")
+        return client[0] if client else "unknown"
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware для добавления security headers
+class CachedCORSMiddleware(CORSMiddleware):
     """
+    CORSMiddleware с заранее собранными заголовками.
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-
-        # Проверяем режим разработки
-        is_development = os.getenv("ENVIRONMENT", "production").lower() in [
-            "development",
-            "dev",
-        ]
-
-        # Добавляем security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-
-        # Специальная обработка для Swagger UI endpoints
-        swagger_paths = ["/docs", "/redoc", "/openapi.json"]
-        is_swagger_endpoint = any(
-            request.url.path.startswith(path) for path in swagger_paths
-        )
-
-        if is_swagger_endpoint:
-            csp = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-                "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-                "img-src 'self' data: https: https://fastapi.tiangolo.com; "
-                "font-src 'self' https://cdn.jsdelivr.net; "
-                "connect-src 'self'"
-            )
-        elif is_development:
-            # Development: более мягкие правила
-            csp = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline'; "
-                "style-src 'self' 'unsafe-inline'; "
-                "img-src 'self' data: https:; "
-                "font-src 'self'; "
-                "connect-src 'self'"
-            )
-        else:
-            # Production: строгий CSP для обычных страниц
-            csp = (
-                "default-src 'self'; "
-                "script-src 'self'; "
-                "style-src 'self'; "
-                "img-src 'self' data:; "
-                "font-src 'self'; "
-                "connect-src 'self'; "
-                "object-src 'none'; "
-                "base-uri 'self'"
-            )
-
-        response.headers["Content-Security-Policy"] = csp
-        return response
-
-
-class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware для мониторинга производительности
+    Ответ на preflight зависит только от Origin и запрошенных метода и
+    заголовков, CORS заголовки обычного ответа - только от Origin. Поэтому
+    они собираются один раз и дальше добавляются готовыми байтовыми парами.
     """
 
-    def __init__(self, app: ASGIApp, slow_request_threshold: float = 1.0):
-        super().__init__(app)
-        self.slow_request_threshold = slow_request_threshold  # секунды
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-
-        try:
-            response = await call_next(request)
-            duration = time.time() - start_time
-
-            # Логируем медленные запросы
-            if duration > self.slow_request_threshold:
-                logger.warning(
-                    f"Slow request detected: {request.method} {request.url.path}",
-                    extra={
-                        "method": request.method,
-                        "path": request.url.path,
-                        "duration_ms": round(duration * 1000, 2),
-                        "threshold_ms": self.slow_request_threshold * 1000,
-                        "status_code": response.status_code,
-                        "category": "performance",
-                    },
-                )
-
-            return response
-
-        except Exception as e:
-            duration = time.time() - start_time
-
-            # Логируем производительность даже для ошибочных запросов
-            logger.error(
-                f"Request failed with duration: {duration:.3f}s",
-                extra={
-                    "method": request.method,
-                    "path": request.url.path,
-                    "duration_ms": round(duration * 1000, 2),
-                    "error_type": type(e).__name__,
-                    "category": "performance",
-                },
+    def __init__(self, app: ASGIApp, **kwargs):
+        super().__init__(app, **kwargs)
+        self._preflight_cache = {}
+        self._simple_headers_cache = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Один проход по сырым заголовкам вместо Headers и нескольких .get
+        origin = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = origin or value
+            elif name == b"access-control-request-method":
+                request_method = request_method or value
+            elif name == b"access-control-request-headers":
+                request_headers = request_headers or value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._send_preflight(
+                scope, send, (origin, request_method, request_headers)
             )
+            return
 
-            raise
-
-
-class ErrorTrackingMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware для отслеживания ошибок на уровне HTTP
-    """
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        try:
-            response = await call_next(request)
-
-            # Отслеживаем HTTP ошибки (4xx, 5xx)
-            if response.status_code >= 400:
-                error_tracker.track_error(
-                    error_type=f"HTTP_{response.status_code}",
-                    error_message=f"HTTP {response.status_code} response",
-                    context={
-                        "method": request.method,
-                        "path": request.url.path,
-                        "status_code": response.status_code,
-                        "client_ip": request.client.host if request.client else None,
-                    },
-                )
-
-            return response
-
-        except Exception as e:
-            # Отслеживаем необработанные исключения
-            error_tracker.track_error(
-                error_type=f"UNHANDLED_{type(e).__name__}",
-                error_message=str(e),
-                context={
-                    "method": request.method,
-                    "path": request.url.path,
-                    "client_ip": request.client.host if request.client else None,
+        # При allow_origins=["*"] ответ зависит еще и от cookie
+        if self.allow_all_origins:
+            await self.simple_response(
+                scope, receive, send, request_headers=Headers(scope=scope)
+            )
+            return
+
+        cors_headers = self._get_simple_headers(origin)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                raw_headers = message.get("headers", ())
+                if any(name in _CORS_RESPONSE_HEADERS for name, _ in raw_headers):
+                    await self.send(message, send, Headers(scope=scope))
+                    return
+                message["headers"] = [*raw_headers, *cors_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_preflight(self, scope: Scope, send: Send, key: tuple) -> None:
+        """Отправить ответ на preflight, собрав его при первом запросе"""
+        cached = self._preflight_cache.get(key)
+        if cached is None:
+            response = self.preflight_response(request_headers=Headers(scope=scope))
+            # Кортеж: общий список заголовков не должен изменяться по пути
+            cached = (
+                {
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": tuple(response.raw_headers),
                 },
+                {"type": "http.response.body", "body": response.body},
             )
-
-            raise
+            if len(self._preflight_cache) < _CORS_CACHE_SIZE:
+                self._preflight_cache[key] = cached
+
+        start, body = cached
+        # Копии словарей: вышестоящие middleware подменяют headers в сообщении
+        await send(dict(start))
+        await send(dict(body))
+
+    def _get_simple_headers(self, origin: bytes) -> tuple:
+        """CORS заголовки обычного ответа для данного Origin"""
+        cached = self._simple_headers_cache.get(origin)
+        if cached is None:
+            cached = tuple(
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in self.simple_headers.items()
+            )
+            # Разрешенный Origin возвращается явно, как в allow_explicit_origin
+            if self.is_allowed_origin(origin=origin.decode("latin-1")):
+                cached += (
+                    (b"access-control-allow-origin", origin),
+                    (b"vary", b"Origin"),
+                )
+            if len(self._simple_headers_cache) < _CORS_CACHE_SIZE:
+                self._simple_headers_cache[origin] = cached
+        return cached
 
 
 def setup_middleware(app, config: dict = None):
@@ -287,26 +405,13 @@ def setup_middleware(app, config: dict = None):
     """
     config = config or {}
 
-    # Порядок важен! Middleware применяются в обратном порядке добавления
-
-    # 1. Error tracking (последний, чтобы отловить все ошибки)
-    app.add_middleware(ErrorTrackingMiddleware)
-
-    # 2. Performance monitoring
+    # Логирование, security headers, мониторинг и отслеживание ошибок
+    # выполняются одним middleware, без отдельного ASGI-слоя на каждую задачу
     app.add_middleware(
-        PerformanceMonitoringMiddleware,
+        ObservabilityMiddleware,
+        exclude_paths=config.get("exclude_paths", _DEFAULT_EXCLUDE_PATHS),
         slow_request_threshold=config.get("slow_request_threshold", 1.0),
-    )
-
-    # 3. Security headers
-    app.add_middleware(SecurityHeadersMiddleware)
-
-    # 4. Request logging (первый, чтобы логировать все запросы)
-    app.add_middleware(
-        RequestLoggingMiddleware,
-        exclude_paths=config.get(
-            "exclude_paths", ["/health", "/docs", "/openapi.json", "/redoc"]
-        ),
+        noisy_paths=config.get("noisy_paths"),
     )
 
     logger.info("All middleware configured successfully")
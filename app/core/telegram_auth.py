@@ -1,17 +1,29 @@
 import hashlib
 import hmac
-import json
-import urllib.parse
 from urllib.parse import unquote_plus
 import logging
-from typing import Dict, Any
-from datetime import datetime, timezone
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+import orjson
 from fastapi import HTTPException, status
 
 from app.core.exceptions import ValidationError
 
 logger = logging.getLogger(__name__)
 
+# Параметры кэша проверенных initData
+AUTH_CACHE_MAXSIZE = 4096
+AUTH_CACHE_TTL = 60.0
+
+# Поля initData с JSON значением: поле -> (сообщение, код ошибки)
+_JSON_FIELDS = {
+    "user": ("Invalid user data format", "INVALID_USER_DATA"),
+    "contact": ("Invalid contact data format", "INVALID_CONTACT_DATA"),
+}
+
 
 class TelegramAuthError(Exception):
     """Custom exception for Telegram authentication errors"""
@@ -28,6 +40,13 @@ class TelegramAuth:
             raise ValidationError("Bot token is required")
         self.bot_token = bot_token
         self.secret_key = hashlib.sha256(bot_token.encode()).digest()
+        # Ключ WebApp не меняется за время жизни процесса - считаем один раз
+        self._secret_key = hmac.digest(b"WebAppData", bot_token.encode(), "sha256")
+        # Кэш проверенных initData: повторные запросы не пересчитывают HMAC
+        self._cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._cache_lock = threading.Lock()
 
     def validate_auth_date(self, auth_date: str, max_age_seconds: int = 86400) -> bool:
         """Validate that auth_date is not too old (default: 24 hours)"""
@@ -36,63 +55,92 @@ class TelegramAuth:
                 return False
 
             auth_timestamp = int(auth_date)
-            current_timestamp = int(datetime.now(timezone.utc).timestamp())
+            current_timestamp = int(time.time())
 
             return current_timestamp - auth_timestamp <= max_age_seconds
         except (ValueError, TypeError):
             return False
 
+    def _verify_cached(self, raw_query: str) -> Dict[str, Any]:
+        """Проверить query string с использованием TTL/LRU кэша"""
+        key = hashlib.sha256(raw_query.encode()).digest()
+        now = time.monotonic()
+
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                stored_at, params = entry
+                if now - stored_at < AUTH_CACHE_TTL:
+                    self._cache.move_to_end(key)
+                    return params
+                del self._cache[key]
+
+        params = self._verify_query(raw_query)
+
+        with self._cache_lock:
+            self._cache[key] = (now, params)
+            if len(self._cache) > AUTH_CACHE_MAXSIZE:
+                self._cache.popitem(last=False)
+
+        return params
+
+    def _verify_query(self, raw_query: str) -> Dict[str, Any]:
+        """Проверить подпись query string и разобрать её (без кэша)"""
+        # Parse query string: один проход без промежуточного списка пар,
+        # пустые значения отбрасываются, как в parse_qsl
+        params = {}
+        for chunk in raw_query.split("&"):
+            key, sep, value = chunk.partition("=")
+            if sep and value:
+                params[unquote_plus(key)] = unquote_plus(value)
+
+        # Extract and validate hash
+        their_hash = params.pop("hash", None)
+        if not their_hash:
+            raise TelegramAuthError("Hash parameter missing", "NO_HASH")
+
+        # Step 1: build data-check-string (ключи уникальны, сортировка по ключу)
+        data_check_string = "\n".join(
+            [f"{key}={value}" for key, value in sorted(params.items())]
+        )
+
+        # Step 2: calculate our own hash (одиночный вызов HMAC в OpenSSL)
+        calc_hash = hmac.digest(
+            self._secret_key, data_check_string.encode(), "sha256"
+        ).hex()
+
+        # Сравнение за постоянное время
+        if not hmac.compare_digest(calc_hash.encode(), their_hash.encode()):
+            raise TelegramAuthError("Telegram signature mismatch", "INVALID_HASH")
+
+        # Step 3: JSON-decode large fields **after** the verification
+        for field, (message, error_code) in _JSON_FIELDS.items():
+            value = params.get(field)
+            if value is None:
+                continue
+            try:
+                params[field] = orjson.loads(unquote_plus(value))
+            except orjson.JSONDecodeError:
+                raise TelegramAuthError(message, error_code)
+
+        return params
+
     def validate_telegram_query(self, raw_query: str) -> Dict[str, Any]:
         """
         Validate *any* Telegram Mini-App query string
         (initData or contact) and return a parsed dict.
         """
         try:
-            if not raw_query or not raw_query.strip():
+            if not raw_query or raw_query.isspace():
                 raise TelegramAuthError("Empty query data", "EMPTY_DATA")
 
-            # Parse query string
-            params = dict(urllib.parse.parse_qsl(raw_query, keep_blank_values=False))
-
-            # Extract and validate hash
-            their_hash = params.pop("hash", None)
-            if not their_hash:
-                raise TelegramAuthError("Hash parameter missing", "NO_HASH")
-
-            # Step 1: build data-check-string
-            data_list = [f"{k}={params[k]}" for k in sorted(params)]
-            data_check_string = "\n".join(data_list)
-
-            # Step 2: calculate our own hash
-            secret_key = hmac.new(
-                b"WebAppData", self.bot_token.encode(), hashlib.sha256
-            ).digest()
-
-            calc_hash = hmac.new(
-                secret_key, data_check_string.encode(), hashlib.sha256
-            ).hexdigest()
-
-            if calc_hash != their_hash:
-                raise TelegramAuthError("Telegram signature mismatch", "INVALID_HASH")
+            params = self._verify_cached(raw_query)
 
-            # Step 3: JSON-decode large fields **after** the verification
-            if "user" in params:
-                try:
-                    params["user"] = json.loads(unquote_plus(params["user"]))
-                except json.JSONDecodeError:
-                    raise TelegramAuthError(
-                        "Invalid user data format", "INVALID_USER_DATA"
-                    )
-
-            if "contact" in params:
-                try:
-                    params["contact"] = json.loads(unquote_plus(params["contact"]))
-                except json.JSONDecodeError:
-                    raise TelegramAuthError(
-                        "Invalid contact data format", "INVALID_CONTACT_DATA"
-                    )
-
-            return params
+            # Копия, чтобы вызывающий код не изменял закэшированные данные
+            return {
+                key: dict(value) if isinstance(value, dict) else value
+                for key, value in params.items()
+            }
 
         except TelegramAuthError:
             raise
@@ -106,7 +154,7 @@ class TelegramAuth:
         """
         try:
             # Basic validation
-            if not init_data or not init_data.strip():
+            if not init_data or init_data.isspace():
                 raise TelegramAuthError("Authentication data required", "MISSING_DATA")
 
             # Use the new validation method
@@ -186,3 +234,9 @@ class TelegramAuth:
                 detail="Contact authentication failed",
                 headers={"WWW-Authenticate": "tma"},
             )
+
+
+@lru_cache(maxsize=None)
+def get_telegram_auth(bot_token: str) -> TelegramAuth:
+    """Общий экземпляр TelegramAuth для каждого бота"""
+    return TelegramAuth(bot_token)
@@ -1,15 +1,73 @@
+import asyncio
 import httpx
 import logging
+import orjson
 from typing import Optional
 from enum import Enum
 from app.core.config import TELEGRAM_BOT_TOKEN_STAFF, TELEGRAM_BOT_TOKEN_STUDENT
 
 logger = logging.getLogger(__name__)
 
+# Один клиент на процесс: keep-alive соединения к api.telegram.org переиспользуются
+_client: Optional[httpx.AsyncClient] = None
+
+# Очередь фоновой отправки: сообщения рассылки уходят пачками параллельно
+_SEND_BATCH_SIZE = 32
+_SEND_BATCH_WINDOW = 0.005  # секунды на сбор пачки
+_SEND_DRAIN_TIMEOUT = 5.0
+_send_queue: Optional[asyncio.Queue] = None
+_sender_task: Optional[asyncio.Task] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        )
+    return _client
+
+
+async def close_telegram_client() -> None:
+    """Close the shared HTTP client (called on application shutdown)"""
+    global _client, _sender_task
+    if _sender_task is not None:
+        # Даем фоновому отправителю дослать очередь, затем останавливаем
+        try:
+            await asyncio.wait_for(_send_queue.join(), timeout=_SEND_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %s queued Telegram messages", _send_queue.qsize())
+        _sender_task.cancel()
+        _sender_task = None
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 class BotType(str, Enum):
     STAFF = "STAFF"
     STUDENT = "STUDENT"
 
+
+# URL отправки для каждого бота: токены неизменны в течение жизни процесса
+_SEND_URL = {
+    BotType.STAFF: (
+        f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN_STAFF}/sendMessage"
+        if TELEGRAM_BOT_TOKEN_STAFF else None
+    ),
+    BotType.STUDENT: (
+        f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN_STUDENT}/sendMessage"
+        if TELEGRAM_BOT_TOKEN_STUDENT else None
+    ),
+}
+
+# Тело запроса сериализуется orjson, заголовок передается явно
+_JSON_HEADERS = {"content-type": "application/json"}
+
+
 async def send_telegram_message(
     chat_id: int, 
     text: str, 
@@ -28,32 +86,71 @@ async def send_telegram_message(
     Returns:
         bool: True if successful, False otherwise
     """
-    token = TELEGRAM_BOT_TOKEN_STAFF if bot_type == BotType.STAFF else TELEGRAM_BOT_TOKEN_STUDENT
+    url = _SEND_URL.get(bot_type)
     
-    if not token:
-        logger.warning(f"Token for {bot_type} is not set. Cannot send notification.")
+    if url is None:
+        logger.warning("Token for %s is not set. Cannot send notification.", bot_type)
         return False
-        
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    
-    payload = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": parse_mode
-    }
     
     try:
-        logger.debug(f"Sending Telegram message to chat_id {chat_id} using {bot_type} bot")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, timeout=10.0)
-            
-            if response.status_code == 200:
-                logger.info(f"Telegram message sent successfully to chat_id {chat_id}")
-                return True
-            else:
-                logger.error(f"Failed to send Telegram message ({bot_type}) to chat_id {chat_id}: HTTP {response.status_code} - {response.text}")
-                return False
+        payload = orjson.dumps({
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode
+        })
+
+        logger.debug("Sending Telegram message to chat_id %s using %s bot", chat_id, bot_type)
+        response = await _get_client().post(url, content=payload, headers=_JSON_HEADERS)
+
+        if response.status_code == 200:
+            logger.info("Telegram message sent successfully to chat_id %s", chat_id)
+            return True
+        else:
+            logger.error("Failed to send Telegram message (%s) to chat_id %s: HTTP %s - %s", bot_type, chat_id, response.status_code, response.text)
+            return False
                 
     except Exception as e:
-        logger.error(f"Error sending Telegram message ({bot_type}) to chat_id {chat_id}: {str(e)}", exc_info=True)
+        logger.error("Error sending Telegram message (%s) to chat_id %s: %s", bot_type, chat_id, e, exc_info=True)
         return False
+
+
+def queue_telegram_message(
+    chat_id: int,
+    text: str,
+    parse_mode: str = "HTML",
+    bot_type: BotType = BotType.STAFF
+) -> None:
+    """
+    Queue a message for background sending without waiting for Telegram.
+
+    Messages queued close together are sent concurrently in one batch, so a
+    fan-out to many users costs about one round-trip instead of one per user.
+    Must be called from a running event loop.
+    """
+    global _send_queue, _sender_task
+    if _send_queue is None:
+        _send_queue = asyncio.Queue()
+    if _sender_task is None or _sender_task.done():
+        # Перезапуск работает с той же очередью: накопленные сообщения сохраняются
+        _sender_task = asyncio.get_running_loop().create_task(_sender_loop())
+    _send_queue.put_nowait((chat_id, text, parse_mode, bot_type))
+
+
+async def _sender_loop() -> None:
+    """Background consumer: collect queued messages into batches and send them"""
+    queue = _send_queue
+    while True:
+        batch = [await queue.get()]
+        # Короткое окно, чтобы сообщения одной рассылки попали в одну пачку
+        await asyncio.sleep(_SEND_BATCH_WINDOW)
+        while len(batch) < _SEND_BATCH_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+
+        try:
+            await asyncio.gather(
+                *(send_telegram_message(*item) for item in batch),
+                return_exceptions=True,
+            )
+        finally:
+            for _ in batch:
+                queue.task_done()
@@ -1,6 +1,8 @@
-import re
 from app.core.exceptions import ValidationError
 
+# Предел длины сырого ввода: до 20 цифр с форматированием заведомо короче
+_MAX_RAW_PHONE_LENGTH = 64
+
 
 def clean_phone_number(phone: str) -> str:
     """
@@ -10,8 +12,17 @@ def clean_phone_number(phone: str) -> str:
     if not phone:
         raise ValidationError("Phone number cannot be empty")
 
-    # Удаляем все кроме цифр
-    clean_phone = re.sub(r"\D", "", phone)
+    # Слишком длинный ввод отклоняем до посимвольной обработки
+    if len(phone) > _MAX_RAW_PHONE_LENGTH:
+        raise ValidationError("Phone number is too long")
+
+    # Частый случай: номер уже в виде "+77011234567" или "77011234567",
+    # проверка isascii/isdecimal целиком в C без посимвольного фильтра
+    clean_phone = phone.removeprefix("+")
+    if not (clean_phone.isascii() and clean_phone.isdecimal()):
+        # Удаляем все кроме цифр: str.isdecimal совпадает с классом \d в re,
+        # но фильтр выполняется в C без движка регулярных выражений
+        clean_phone = "".join(filter(str.isdecimal, phone))
 
     # Проверяем что остались только цифры
     if not clean_phone:
@@ -1,13 +1,20 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import time
+
+import orjson
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from importlib import import_module
 from slowapi.errors import RateLimitExceeded
 
 from app.core.limits import limiter, rate_limit_handler
 from app.core.init_db import init_database
 from app.core.error_handlers import setup_exception_handlers
 from app.core.database import db_manager
-from app.core.middleware import setup_middleware
+from app.core.exceptions import DatabaseConnectionError
+from app.core.middleware import CachedCORSMiddleware, setup_middleware
+from app.core.telegram_sender import close_telegram_client
 from app.core.logging_utils import (
     setup_logging,
     get_logger,
@@ -19,28 +26,62 @@ from app.core.config import (
     APP_NAME,
     APP_VERSION,
     DEBUG,
+    INIT_SCHEMA,
     LOG_LEVEL,
     LOG_FORMAT,
+    LOG_SAMPLE_RATE,
 )
 
-from app.staff.routers import users as staff_users
-from app.staff.routers import clubs as staff_clubs
-from app.staff.routers import sections as staff_sections
-from app.staff.routers import groups as staff_groups
-from app.staff.routers import superadmin
-from app.staff.routers import invitations
-from app.staff.routers import notifications as staff_notifications
-from app.staff.routers import team as staff_team
-from app.staff.routers import tariffs as staff_tariffs
-from app.staff.routers import students as staff_students
-from app.staff.routers import analytics as staff_analytics
-from app.students.routers import users as student_users
-from app.students.routers import memberships as student_memberships
-from app.students.routers import attendance as student_attendance
-from app.students.routers import payments as student_payments
-from app.students.routers import schedule as student_schedule
-from app.students.routers import clubs as student_clubs
-from app.staff.routers import schedule
+# Роутеры API в порядке подключения.
+# NOTE: Order matters! More specific routes must come before parameterized routes
+# staff_notifications (/staff/notifications) must come BEFORE staff_users (/staff/{user_id})
+ROUTERS = (
+    # Staff routers
+    "app.staff.routers.notifications",
+    "app.staff.routers.users",
+    "app.staff.routers.clubs",
+    "app.staff.routers.sections",
+    "app.staff.routers.groups",
+    "app.staff.routers.invitations",
+    "app.staff.routers.superadmin",
+    "app.staff.routers.team",
+    "app.staff.routers.tariffs",
+    "app.staff.routers.students",
+    "app.staff.routers.analytics",
+    "app.staff.routers.schedule",
+    # Student routers
+    "app.students.routers.users",
+    "app.students.routers.memberships",
+    "app.students.routers.attendance",
+    "app.students.routers.payments",
+    "app.students.routers.schedule",
+    "app.students.routers.clubs",
+)
+API_PREFIX = "/api/v1"
+
+# Неизменные ответы служебных endpoints сериализуются один раз
+_ROOT_BODY = orjson.dumps(
+    {"message": f"{APP_NAME} is running", "version": APP_VERSION, "docs": "/docs"}
+)
+_HEALTH_OK_BODY = orjson.dumps(
+    {"status": "healthy", "database": "connected", "version": APP_VERSION}
+)
+_HEALTH_FAIL_BODY = orjson.dumps(
+    {"status": "unhealthy", "database": "disconnected", "version": APP_VERSION}
+)
+
+# Проверка БД в /health: ограничена по времени, результат кэшируется,
+# при недоступной БД интервал между проверками удваивается до предела
+_DB_HEALTH_TIMEOUT = 0.25
+_DB_HEALTH_TTL = 1.0
+_DB_HEALTH_MAX_INTERVAL = 30.0
+# healthy: None - БД еще не проверялась; probe - выполняющаяся проверка
+_db_health = {
+    "checked_at": float("-inf"),
+    "healthy": None,
+    "interval": 0.0,
+    "probe": None,
+}
 
 # Настройка системы логирования
 setup_logging(LOG_LEVEL, LOG_FORMAT)
@@ -63,9 +104,16 @@ async def lifespan(app: FastAPI):
         await db_manager.check_connection()
         logger.info("✅ Database connection established")
 
-        # Инициализация базы данных
-        await init_database()
-        logger.info("✅ Database initialized")
+        # Инициализация базы данных: при нескольких воркерах ее достаточно
+        # выполнить в одном, остальные запускаются с INIT_SCHEMA=false
+        if INIT_SCHEMA:
+            await init_database()
+            logger.info("✅ Database initialized")
+        else:
+            logger.info("Database initialization skipped (INIT_SCHEMA disabled)")
+
+        # Прогрев пула соединений
+        await db_manager.warm_up_pool()
 
         # Логируем бизнес-событие
         log_business_event(
@@ -99,6 +147,8 @@ async def lifespan(app: FastAPI):
         await db_manager.close_connections()
         logger.info("✅ Database connections closed")
 
+        await close_telegram_client()
+
     except Exception as e:
         logger.error(f"❌ Error during shutdown: {str(e)}")
 
@@ -111,10 +161,11 @@ app = FastAPI(
     version=APP_VERSION,
     lifespan=lifespan,
     debug=DEBUG,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
-    CORSMiddleware,
+    CachedCORSMiddleware,
     allow_origins=[
         "https://training-tracker-mini-app.vercel.app",
         "https://tensu-students.vercel.app",
@@ -139,12 +190,13 @@ setup_middleware(
     {
         "slow_request_threshold": 5.0,
         "exclude_paths": [
-            "/health",
             "/docs",
             "/openapi.json",
             "/redoc",
             "/favicon.ico",
         ],
+        # Health-check пробы логируются выборочно
+        "noisy_paths": {"/health": LOG_SAMPLE_RATE},
     },
 )
 
@@ -155,26 +207,56 @@ app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
 
 # Include routers with API version prefix
-# Staff routers
-# NOTE: Order matters! More specific routes must come before parameterized routes
-# staff_notifications (/staff/notifications) must come BEFORE staff_users (/staff/{user_id})
-app.include_router(staff_notifications.router, prefix="/api/v1")
-app.include_router(staff_users.router, prefix="/api/v1")
-app.include_router(staff_clubs.router, prefix="/api/v1")
-app.include_router(staff_sections.router, prefix="/api/v1")
-app.include_router(staff_groups.router, prefix="/api/v1")
-app.include_router(invitations.router, prefix="/api/v1")
-app.include_router(superadmin.router, prefix="/api/v1")
-app.include_router(staff_team.router, prefix="/api/v1")
-app.include_router(staff_tariffs.router, prefix="/api/v1")
-app.include_router(staff_students.router, prefix="/api/v1")
-app.include_router(staff_analytics.router, prefix="/api/v1")
-app.include_router(schedule.router, prefix="/api/v1")
-
-# Student routers
-app.include_router(student_users.router, prefix="/api/v1")
-app.include_router(student_memberships.router, prefix="/api/v1")
-app.include_router(student_attendance.router, prefix="/api/v1")
-app.include_router(student_payments.router, prefix="/api/v1")
-app.include_router(student_schedule.router, prefix="/api/v1")
-app.include_router(student_clubs.router, prefix="/api/v1")
+for module_name in ROUTERS:
+    app.include_router(import_module(module_name).router, prefix=API_PREFIX)
+
+
+@app.get("/", include_in_schema=False)
+async def root():
+    """Информация о сервисе"""
+    return Response(content=_ROOT_BODY, media_type="application/json")
+
+
+async def _probe_database() -> bool:
+    """Проверить соединение с БД с ограничением по времени и обновить состояние"""
+    try:
+        await asyncio.wait_for(db_manager.check_connection(), _DB_HEALTH_TIMEOUT)
+        healthy = True
+        _db_health["interval"] = _DB_HEALTH_TTL
+    except (DatabaseConnectionError, asyncio.TimeoutError):
+        healthy = False
+        _db_health["interval"] = min(
+            max(_db_health["interval"], _DB_HEALTH_TTL) * 2, _DB_HEALTH_MAX_INTERVAL
+        )
+
+    _db_health["healthy"] = healthy
+    _db_health["checked_at"] = time.monotonic()
+    return healthy
+
+
+@app.get("/health", include_in_schema=False)
+async def health_check():
+    """Проверка состояния приложения и соединения с БД"""
+    probe = _db_health["probe"]
+    if (
+        probe is None
+        and time.monotonic() - _db_health["checked_at"] >= _db_health["interval"]
+    ):
+        probe = asyncio.ensure_future(_probe_database())
+        _db_health["probe"] = probe
+        probe.add_done_callback(lambda _: _db_health.update(probe=None))
+
+    if probe is not None:
+        # Параллельные запросы ждут ту же проверку, а не читают старое
+        # (или еще не известное) состояние; shield - чтобы отмена одного
+        # запроса не отменила проверку для остальных
+        healthy = await asyncio.shield(probe)
+    else:
+        healthy = _db_health["healthy"]
+
+    if not healthy:
+        return Response(
+            content=_HEALTH_FAIL_BODY, status_code=503, media_type="application/json"
+        )
+
+    return Response(content=_HEALTH_OK_BODY, media_type="application/json")
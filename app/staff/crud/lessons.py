@@ -1,3 +1,4 @@
+import logging
 from datetime import date, time
 from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy import and_, func, or_
@@ -27,6 +28,8 @@ from app.staff.schemas.lessons import (
     LessonFilters,
 )
 
+logger = logging.getLogger(__name__)
+
 
 @db_operation
 async def get_lesson_by_id(session: AsyncSession, lesson_id: int) -> Lesson:
@@ -359,7 +362,7 @@ async def cancel_lesson(
 
     # NOTIFICATION: Notify all enrolled students
     try:
-        from app.core.telegram_sender import send_telegram_message, BotType
+        from app.core.telegram_sender import queue_telegram_message, BotType
         from app.staff.models.enrollments import StudentEnrollment, EnrollmentStatus
         from app.students.models.users import UserStudent
 
@@ -388,8 +391,6 @@ async def cancel_lesson(
         lesson_time_str = lesson.planned_start_time.strftime("%H:%M")
         
         if students:
-            import asyncio
-            
             notification_text = (
                 f"⚠️ <b>Training Cancelled</b>\n\n"
                 f"The training scheduled for <b>{lesson_date_str} at {lesson_time_str}</b> "
@@ -399,23 +400,17 @@ async def cancel_lesson(
             if cancel_data.reason:
                 notification_text += f"Reason: {cancel_data.reason}"
 
-            tasks = []
+            # Рассылка уходит в фоне пачками, не задерживая ответ
             for student in students:
                 if student.telegram_id:
-                     tasks.append(
-                         send_telegram_message(
-                             student.telegram_id, 
-                             notification_text, 
-                             bot_type=BotType.STUDENT
-                         )
-                     )
-            
-            if tasks:
-                asyncio.create_task(asyncio.gather(*tasks))
+                    queue_telegram_message(
+                        student.telegram_id,
+                        notification_text,
+                        bot_type=BotType.STUDENT
+                    )
 
     except Exception as e:
-        import logging
-        logging.getLogger(__name__).error(f"Failed to notify students of cancellation: {e}")
+        logger.error(f"Failed to notify students of cancellation: {e}")
 
     return lesson
 
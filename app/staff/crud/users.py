@@ -22,7 +22,7 @@ from app.staff.models.users import UserStaff
 from app.staff.models.clubs import Club
 from app.staff.models.sections import Section
 from app.core.config import TELEGRAM_BOT_TOKEN_STAFF
-from app.core.telegram_auth import TelegramAuth
+from app.core.telegram_auth import get_telegram_auth
 from app.staff.schemas.users import (
     UserStaffCreate,
     UserStaffUpdate,
@@ -34,8 +34,6 @@ from app.staff.schemas.users import (
 if not TELEGRAM_BOT_TOKEN_STAFF:
     raise ValidationError("TELEGRAM_BOT_TOKEN_STAFF is required")
 
-telegram_auth = TelegramAuth(TELEGRAM_BOT_TOKEN_STAFF)
-
 
 @db_operation
 async def get_user_staff_by_telegram_id(session: AsyncSession, telegram_id: int):
@@ -153,6 +151,7 @@ async def create_user_staff(
 
         # Аутентификация контактных данных
         try:
+            telegram_auth = get_telegram_auth(TELEGRAM_BOT_TOKEN_STAFF)
             contact_data = telegram_auth.authenticate_contact_request(
                 user.contact_init_data
             )
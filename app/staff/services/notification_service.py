@@ -61,7 +61,7 @@ async def get_notification_recipients(
     owner_admin_result = await session.execute(owner_admin_query)
     owner_admin_ids = owner_admin_result.scalars().all()
     recipients.update(owner_admin_ids)
-    logger.debug(f"Found {len(owner_admin_ids)} owners/admins for club {club_id}: {list(owner_admin_ids)}")
+    logger.debug("Found %d owners/admins for club %s: %s", len(owner_admin_ids), club_id, owner_admin_ids)
     
     # Add coach if group_id is provided
     if include_coach and group_id:
@@ -70,7 +70,7 @@ async def get_notification_recipients(
         coach_id = group_result.scalar_one_or_none()
         if coach_id:
             recipients.add(coach_id)
-            logger.debug(f"Added coach {coach_id} to notification recipients for group {group_id}")
+            logger.debug("Added coach %s to notification recipients for group %s", coach_id, group_id)
     
     return recipients
 
@@ -93,17 +93,17 @@ async def send_membership_notification(
         additional_data: Optional dict with additional data (days, amount, etc.)
     """
     try:
-        logger.debug(f"Starting notification for type: {notification_type}, enrollment: {enrollment.id}, student: {student_id}")
+        logger.debug("Starting notification for type: %s, enrollment: %s, student: %s", notification_type, enrollment.id, student_id)
         
         # Ensure relationships are loaded
         if not enrollment.group:
-            logger.error(f"Enrollment {enrollment.id} missing group relationship")
+            logger.error("Enrollment %s missing group relationship", enrollment.id)
             return
         if not enrollment.group.section:
-            logger.error(f"Enrollment {enrollment.id} missing section relationship")
+            logger.error("Enrollment %s missing section relationship", enrollment.id)
             return
         if not enrollment.group.section.club:
-            logger.error(f"Enrollment {enrollment.id} missing club relationship")
+            logger.error("Enrollment %s missing club relationship", enrollment.id)
             return
         
         club_id = enrollment.group.section.club_id
@@ -117,7 +117,7 @@ async def send_membership_notification(
         student = student_result.scalar_one_or_none()
         
         if not student:
-            logger.warning(f"Student {student_id} not found, skipping notification")
+            logger.warning("Student %s not found, skipping notification", student_id)
             return
         
         student_name = f"{student.first_name} {student.last_name or ''}".strip()
@@ -132,7 +132,7 @@ async def send_membership_notification(
         )
         
         if not notification_config:
-            logger.warning(f"Unknown notification type: {notification_type}")
+            logger.warning("Unknown notification type: %s", notification_type)
             return
         
         # Get recipients
@@ -144,20 +144,20 @@ async def send_membership_notification(
         )
         
         if not recipients:
-            logger.warning(f"No recipients found for club {club_id}, group {group_id}. Check if club has owners/admins or group has a coach.")
+            logger.warning("No recipients found for club %s, group %s. Check if club has owners/admins or group has a coach.", club_id, group_id)
             return
         
-        logger.info(f"Sending {notification_type} notification to {len(recipients)} recipients: {recipients}")
+        logger.info("Sending %s notification to %d recipients: %s", notification_type, len(recipients), recipients)
         
         # Send notifications to all recipients
         for recipient_id in recipients:
             try:
                 staff_user = await session.get(UserStaff, recipient_id)
                 if not staff_user:
-                    logger.warning(f"Staff user {recipient_id} not found, skipping notification")
+                    logger.warning("Staff user %s not found, skipping notification", recipient_id)
                     continue
                 
-                logger.info(f"Notifying staff user {recipient_id} (telegram_id: {staff_user.telegram_id})")
+                logger.info("Notifying staff user %s (telegram_id: %s)", recipient_id, staff_user.telegram_id)
                 
                 # Send Telegram message
                 telegram_sent = False
@@ -169,13 +169,13 @@ async def send_membership_notification(
                             bot_type=BotType.STAFF
                         )
                         if telegram_sent:
-                            logger.info(f"Telegram message sent successfully to {staff_user.telegram_id}")
+                            logger.info("Telegram message sent successfully to %s", staff_user.telegram_id)
                         else:
-                            logger.warning(f"Failed to send Telegram message to {staff_user.telegram_id}")
+                            logger.warning("Failed to send Telegram message to %s", staff_user.telegram_id)
                     except Exception as tg_error:
-                        logger.error(f"Error sending Telegram message to {staff_user.telegram_id}: {tg_error}", exc_info=True)
+                        logger.error("Error sending Telegram message to %s: %s", staff_user.telegram_id, tg_error, exc_info=True)
                 else:
-                    logger.warning(f"Staff user {recipient_id} has no telegram_id, skipping Telegram notification")
+                    logger.warning("Staff user %s has no telegram_id, skipping Telegram notification", recipient_id)
                 
                 # Create in-app notification
                 try:
@@ -192,16 +192,16 @@ async def send_membership_notification(
                         }
                     )
                     created_notification = await create_notification(session, notification_data)
-                    logger.info(f"Successfully created in-app notification {created_notification.id} for staff user {recipient_id}")
+                    logger.info("Successfully created in-app notification %s for staff user %s", created_notification.id, recipient_id)
                 except Exception as notif_error:
-                    logger.error(f"Failed to create in-app notification for staff user {recipient_id}: {notif_error}", exc_info=True)
+                    logger.error("Failed to create in-app notification for staff user %s: %s", recipient_id, notif_error, exc_info=True)
                     raise  # Re-raise to be caught by outer exception handler
                 
             except Exception as e:
-                logger.error(f"Failed to notify staff user {recipient_id}: {e}", exc_info=True)
+                logger.error("Failed to notify staff user %s: %s", recipient_id, e, exc_info=True)
                 
     except Exception as e:
-        logger.error(f"Failed to send membership notification: {e}", exc_info=True)
+        logger.error("Failed to send membership notification: %s", e, exc_info=True)
 
 
 def _get_notification_config(
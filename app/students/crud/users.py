@@ -14,7 +14,7 @@ from app.core.exceptions import (
 from app.core.validations import clean_phone_number
 from app.students.models.users import UserStudent
 from app.core.config import TELEGRAM_BOT_TOKEN_STUDENT
-from app.core.telegram_auth import TelegramAuth
+from app.core.telegram_auth import get_telegram_auth
 from app.students.schemas.users import (
     UserStudentCreate,
     UserStudentUpdate,
@@ -25,8 +25,6 @@ from app.students.schemas.users import (
 if not TELEGRAM_BOT_TOKEN_STUDENT:
     raise ValidationError("TELEGRAM_BOT_TOKEN_STUDENT is required")
 
-telegram_auth = TelegramAuth(TELEGRAM_BOT_TOKEN_STUDENT)
-
 
 @db_operation
 async def get_user_student_by_telegram_id(session: AsyncSession, telegram_id: int):
@@ -134,6 +132,7 @@ async def create_user_student(
 
     # Аутентификация контактных данных
     try:
+        telegram_auth = get_telegram_auth(TELEGRAM_BOT_TOKEN_STUDENT)
         contact_data = telegram_auth.authenticate_contact_request(
             user.contact_init_data
         )